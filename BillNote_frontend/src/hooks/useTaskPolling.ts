@@ -1,6 +1,6 @@
 import { useEffect, useRef } from 'react'
 import { useTaskStore } from '@/store/taskStore'
-import { get_task_status } from '@/services/note.ts'
+import { get_task_result, get_task_status, get_task_transcript } from '@/services/note.ts'
 import toast from 'react-hot-toast'
 
 export const useTaskPolling = (interval = 3000) => {
@@ -30,7 +30,11 @@ export const useTaskPolling = (interval = 3000) => {
 
           if (status && status !== task.status) {
             if (status === 'SUCCESS') {
-              const { markdown, transcript, audio_meta } = res.result
+              // 状态接口只返回摘要，完成后再单独拉取 Markdown 与转写分段
+              const [{ markdown, audio_meta }, transcript] = await Promise.all([
+                get_task_result(task.id),
+                get_task_transcript(task.id),
+              ])
               toast.success('笔记生成成功')
               updateTaskContent(task.id, {
                 status,
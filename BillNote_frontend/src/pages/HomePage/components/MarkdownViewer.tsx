@@ -55,6 +55,28 @@ const ensureImageUrls = (markdown: string, baseURL: string, mode: ImageUrlMode =
   })
 }
 
+// 内容寻址截图（/static/screenshots/ab/<sha256>.jpg）由后端在地址片段中附带原图宽度与实际生成的 WebP 缩略图宽度：
+// .../<sha256>.jpg#w=1920&thumbs=320,640；没有片段的旧笔记不生成 srcset
+const STORED_IMAGE_PATTERN = /\/([0-9a-f]{64})\.jpg$/
+
+const responsiveImageProps = (src: string) => {
+  const [url, fragment = ''] = src.split('#', 2)
+  if (!STORED_IMAGE_PATTERN.test(url)) return {}
+  const params = new URLSearchParams(fragment)
+  const width = Number(params.get('w'))
+  if (!width) return {}
+  const thumbs = (params.get('thumbs') || '')
+    .split(',')
+    .map(Number)
+    .filter(w => w > 0 && w < width)
+  const srcSet = thumbs.map(w => `${url.replace(/\.jpg$/, `_w${w}.webp`)} ${w}w`)
+  return {
+    srcSet: [...srcSet, `${url} ${width}w`].join(', '),
+    sizes: '(max-width: 768px) 100vw, 768px',
+    loading: 'lazy' as const,
+  }
+}
+
 interface VersionNote {
   ver_id: string
   content: string
@@ -383,9 +405,10 @@ const MarkdownViewer: FC<MarkdownViewerProps> = ({ status }) => {
                         props.src = src
 
                      return(
-                      <Zoom>
+                      <Zoom zoomImg={{ src }}>
                         <img
                           {...props}
+                          {...responsiveImageProps(src)}
                           className="max-w-full"
                         />
                       </Zoom>
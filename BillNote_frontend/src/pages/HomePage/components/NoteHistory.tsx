@@ -89,7 +89,7 @@ const NoteHistory: FC<NoteHistoryProps> = ({ onSelect, selectedId }) => {
               className={cn('flex items-center gap-4')}
             >
               {/* 封面图 */}
-              {task.platform === 'local' ? (
+              {task.platform === 'local' || task.audioMeta.cover_url?.includes('/static/') ? (
                 <img
                   src={
                     task.audioMeta.cover_url ? `${task.audioMeta.cover_url}` : '/placeholder.png'
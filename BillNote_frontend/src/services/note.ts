@@ -41,11 +41,12 @@ export const generateNote = async (data: {
   }
 }
 
-export const delete_task = async ({ video_id, platform }) => {
+export const delete_task = async ({ video_id, platform, task_id }) => {
   try {
     const data = {
       video_id,
       platform,
+      task_id,
     }
     const res = await request.post('/delete_task', data)
 
@@ -59,6 +60,32 @@ export const delete_task = async ({ video_id, platform }) => {
   }
 }
 
+export const get_task_result = async (task_id: string, fields = 'markdown,audio_meta') => {
+  return await request.get('/task_result/' + task_id, { params: { fields } })
+}
+
+// 分页拉取全部转写分段
+export const get_task_transcript = async (task_id: string, pageSize = 1000) => {
+  const segments = []
+  let language = null
+  let total = Infinity
+  while (segments.length < total) {
+    const page = await request.get('/task_transcript/' + task_id, {
+      params: { offset: segments.length, limit: pageSize },
+    })
+    language = page.language
+    total = page.total
+    if (!page.segments.length) break
+    segments.push(...page.segments)
+  }
+  return {
+    language,
+    full_text: segments.map(seg => seg.text).join(' '),
+    segments,
+    raw: null,
+  }
+}
+
 export const get_task_status = async (task_id: string) => {
   try {
     // 成功提示
@@ -1,9 +1,36 @@
+from sqlalchemy import inspect
+
 from app.db.models.models import Model
 from app.db.models.providers import Provider
 from app.db.models.video_tasks import VideoTask
 from app.db.engine import get_engine, Base
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def migrate_indexes(engine) -> list[str]:
+    """
+    为已存在的表补建模型中新增的索引。
+    create_all 只会创建缺失的表，旧数据库里的表不会得到后来加上的索引；这里逐个对比并原地创建，无需重建表。
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(bind=engine, checkfirst=True)
+                created.append(index.name)
+                logger.info(f"已为表 {table.name} 创建索引 {index.name}")
+    return created
+
 
 def init_db():
     engine = get_engine()
 
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    migrate_indexes(engine)
+    Base.metadata.create_all(bind=engine)
@@ -1,10 +1,10 @@
-from app.db.engine import get_db
+from app.db.engine import on_commit, session_scope
 from app.db.models.models import Model
+from app.utils.config_cache import config_cache
 
 
 def get_model_by_provider_and_name(provider_id: str, model_name: str):
-    db = next(get_db())
-    try:
+    with session_scope() as db:
         model = db.query(Model).filter_by(provider_id=provider_id, model_name=model_name).first()
 
         if model:
@@ -15,17 +15,16 @@ def get_model_by_provider_and_name(provider_id: str, model_name: str):
                 "created_at": model.created_at,
             }
         return None
-    finally:
-        db.close()
 
 
 def insert_model(provider_id: str, model_name: str):
-    db = next(get_db())
-    try:
+    with session_scope() as db:
         model = Model(provider_id=provider_id, model_name=model_name)
 
         db.add(model)
-        db.commit()
+        on_commit(db, config_cache.invalidate)
+        # flush 拿到自增 id，refresh 读回数据库生成的 created_at；外层有事务时由外层提交
+        db.flush()
         db.refresh(model)
         return {
             "id": model.id,
@@ -33,47 +32,30 @@ def insert_model(provider_id: str, model_name: str):
             "model_name": model.model_name,
             "created_at": model.created_at,
         }
-    finally:
-        db.close()
 
 
 def get_models_by_provider(provider_id: str):
-    db = next(get_db())
-    try:
+    with session_scope() as db:
         models = db.query(Model).filter_by(provider_id=provider_id).all()
         return [{"id": m.id, "model_name": m.model_name} for m in models]
 
-    finally:
-        db.close()
-
 
 def delete_model(model_id: int):
-    db = next(get_db())
-    try:
-        model = db.query(Model).filter_by(id=model_id).first()
-        if model:
-            db.delete(model)
-            db.commit()
-    finally:
-        db.close()
+    with session_scope() as db:
+        db.query(Model).filter_by(id=model_id).delete()
+        on_commit(db, config_cache.invalidate)
 
 
 def delete_models_by_provider(provider_id: str):
-    db = next(get_db())
-    try:
+    with session_scope() as db:
         db.query(Model).filter_by(provider_id=provider_id).delete()
-        db.commit()
-    finally:
-        db.close()
+        on_commit(db, config_cache.invalidate)
 
 
 def get_all_models():
-    db = next(get_db())
-    try:
+    with session_scope() as db:
         models = db.query(Model).all()
         return [
             {"id": m.id, "provider_id": m.provider_id, "model_name": m.model_name}
             for m in models
         ]
-    finally:
-        db.close()
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, func
+from sqlalchemy import Column, Integer, String, DateTime, Index, func
 from sqlalchemy.orm import declarative_base
 
 from app.db.engine import Base
@@ -6,9 +6,13 @@ from app.db.engine import Base
 
 class VideoTask(Base):
     __tablename__ = "video_tasks"
+    __table_args__ = (
+        # 按视频查询最新任务：等值匹配 platform / video_id，再按 created_at 倒序，无需额外排序
+        Index("ix_video_tasks_platform_video_created", "platform", "video_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     video_id = Column(String, nullable=False)
     platform = Column(String, nullable=False)
     task_id = Column(String, unique=True, nullable=False)
-    created_at = Column(DateTime, server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime, server_default=func.now())
@@ -3,7 +3,8 @@ import os
 import sys
 from app.db.models.providers import Provider
 from app.utils.logger import get_logger
-from app.db.engine import get_engine, Base, get_db
+from app.db.engine import in_unit_of_work, on_commit, session_scope
+from app.utils.config_cache import config_cache
 
 logger = get_logger(__name__)
 
@@ -19,122 +20,109 @@ def get_builtin_providers_path():
 
 
 def seed_default_providers():
-    db = next(get_db())
     try:
-        if db.query(Provider).count() > 0:
-            logger.info("Providers already exist, skipping seed.")
-            return
-
-        json_path = get_builtin_providers_path()
-        try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                providers = json.load(f)
-        except Exception as e:
-            logger.error(f"Failed to read builtin_providers.json: {e}")
-            return
-
-        for p in providers:
-            db.add(Provider(
-                id=p['id'],
-                name=p['name'],
-                api_key=p['api_key'],
-                base_url=p['base_url'],
-                logo=p['logo'],
-                type=p['type'],
-                enabled=p.get('enabled', 1)
-            ))
-        db.commit()
+        with session_scope() as db:
+            if db.query(Provider).count() > 0:
+                logger.info("Providers already exist, skipping seed.")
+                return
+
+            json_path = get_builtin_providers_path()
+            try:
+                with open(json_path, 'r', encoding='utf-8') as f:
+                    providers = json.load(f)
+            except Exception as e:
+                logger.error(f"Failed to read builtin_providers.json: {e}")
+                return
+
+            # 一次性写入全部内置供应商
+            on_commit(db, config_cache.invalidate)
+            db.add_all([
+                Provider(
+                    id=p['id'],
+                    name=p['name'],
+                    api_key=p['api_key'],
+                    base_url=p['base_url'],
+                    logo=p['logo'],
+                    type=p['type'],
+                    enabled=p.get('enabled', 1)
+                )
+                for p in providers
+            ])
         logger.info("Default providers seeded successfully.")
     except Exception as e:
         logger.error(f"Failed to seed default providers: {e}")
-    finally:
-        db.close()
 
 
 def insert_provider(id: str, name: str, api_key: str, base_url: str, logo: str, type_: str, enabled: int = 1):
-    db = next(get_db())
     try:
-        provider = Provider(id=id, name=name, api_key=api_key, base_url=base_url, logo=logo, type=type_, enabled=enabled)
-        db.add(provider)
-        db.commit()
+        with session_scope() as db:
+            on_commit(db, config_cache.invalidate)
+            db.add(Provider(id=id, name=name, api_key=api_key, base_url=base_url, logo=logo, type=type_,
+                            enabled=enabled))
         logger.info(f"Provider inserted successfully. id: {id}, name: {name}, type: {type_}")
         return id
     except Exception as e:
         logger.error(f"Failed to insert provider: {e}")
-        db.rollback()
         raise
-    finally:
-        db.close()
 
 
 def get_enabled_providers():
-    db = next(get_db())
-    try:
+    with session_scope() as db:
         return db.query(Provider).filter_by(enabled=1).all()
-    finally:
-        db.close()
 
 
 def get_provider_by_name(name: str):
-    db = next(get_db())
-    try:
+    with session_scope() as db:
         return db.query(Provider).filter_by(name=name).first()
-    finally:
-        db.close()
 
 
 def get_provider_by_id(id: str):
-    db = next(get_db())
-    try:
+    with session_scope() as db:
         return db.query(Provider).filter_by(id=id).first()
-    finally:
-        db.close()
 
 
 def get_all_providers():
-    db = next(get_db())
-    try:
+    with session_scope() as db:
         return db.query(Provider).all()
-    finally:
-        db.close()
 
 
 def update_provider(id: str, **kwargs):
-    db = next(get_db())
     try:
-        provider = db.query(Provider).filter_by(id=id).first()
-        if not provider:
-            logger.warning(f"Provider {id} not found for update.")
-            return
-
-        updated_fields = []
-        for key, value in kwargs.items():
-            if hasattr(provider, key):
-                # Only update if value is not None and not empty string (for string types)
-                if value is not None and (not isinstance(value, str) or value.strip() != ''):
-                    setattr(provider, key, value)
-                    updated_fields.append(key)
+        with session_scope() as db:
+            provider = db.query(Provider).filter_by(id=id).first()
+            if not provider:
+                logger.warning(f"Provider {id} not found for update.")
+                return
+
+            on_commit(db, config_cache.invalidate)
+            updated_fields = []
+            for key, value in kwargs.items():
+                if hasattr(provider, key):
+                    # Only update if value is not None and not empty string (for string types)
+                    if value is not None and (not isinstance(value, str) or value.strip() != ''):
+                        setattr(provider, key, value)
+                        updated_fields.append(key)
 
         if updated_fields:
-            db.commit()
             logger.info(f"Provider updated successfully. id: {id}, updated_fields: {updated_fields}")
         else:
             logger.info(f"No valid fields to update for provider. id: {id}")
     except Exception as e:
         logger.error(f"Failed to update provider: {e}")
-    finally:
-        db.close()
+        # 处于外层工作单元时交给外层回滚，避免只提交了事务的一部分
+        if in_unit_of_work():
+            raise
 
 
 def delete_provider(id: str):
-    db = next(get_db())
     try:
-        provider = db.query(Provider).filter_by(id=id).first()
-        if provider:
-            db.delete(provider)
-            db.commit()
+        with session_scope() as db:
+            on_commit(db, config_cache.invalidate)
+            deleted = db.query(Provider).filter_by(id=id).delete()
+        if deleted:
             logger.info(f"Provider deleted successfully. id: {id}")
     except Exception as e:
         logger.error(f"Failed to delete provider: {e}")
-    finally:
-        db.close()
\ No newline at end of file
+        # 处于外层工作单元时交给外层回滚，避免只提交了事务的一部分
+        if in_unit_of_work():
+            raise
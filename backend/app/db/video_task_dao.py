@@ -1,5 +1,10 @@
+from datetime import timedelta
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.orm import Session
+
 from app.db.models.video_tasks import VideoTask
-from app.db.engine import get_db
+from app.db.engine import in_unit_of_work, session_scope
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -7,55 +12,104 @@ logger = get_logger(__name__)
 
 # 插入任务
 def insert_video_task(video_id: str, platform: str, task_id: str):
-    db = next(get_db())
     try:
-        task = VideoTask(video_id=video_id, platform=platform, task_id=task_id)
-        db.add(task)
-        db.commit()
-        db.refresh(task)
+        with session_scope() as db:
+            db.add(VideoTask(video_id=video_id, platform=platform, task_id=task_id))
         logger.info(f"Video task inserted successfully. video_id: {video_id}, platform: {platform}, task_id: {task_id}")
     except Exception as e:
         logger.error(f"Failed to insert video task: {e}")
-    finally:
-        db.close()
+        # 处于外层工作单元时交给外层回滚，避免只提交了事务的一部分
+        if in_unit_of_work():
+            raise
 
 
-# 查询任务（最新一条）
+# 查询任务（最新一条），走 (platform, video_id, created_at) 索引，只取 task_id 一列
 def get_task_by_video(video_id: str, platform: str):
-    db = next(get_db())
     try:
-        task = (
-            db.query(VideoTask)
-            .filter_by(video_id=video_id, platform=platform)
-            .order_by(VideoTask.created_at.desc())
-            .first()
-        )
-        if task:
-            logger.info(f"Task found for video_id: {video_id} and platform: {platform}")
-            return task.task_id
-        else:
-            logger.info(f"No task found for video_id: {video_id} and platform: {platform}")
-            return None
+        with session_scope() as db:
+            task_id = db.execute(
+                select(VideoTask.task_id)
+                .where(VideoTask.platform == platform, VideoTask.video_id == video_id)
+                .order_by(VideoTask.created_at.desc(), VideoTask.id.desc())
+                .limit(1)
+            ).scalar()
+            if task_id:
+                logger.info(f"Task found for video_id: {video_id} and platform: {platform}")
+                return task_id
+            else:
+                logger.info(f"No task found for video_id: {video_id} and platform: {platform}")
+                return None
     except Exception as e:
         logger.error(f"Failed to get task by video: {e}")
-    finally:
-        db.close()
 
 
-# 删除任务
-def delete_task_by_video(video_id: str, platform: str):
-    db = next(get_db())
+# 查询某视频的全部任务 ID
+def get_task_ids_by_video(video_id: str, platform: str) -> list[str]:
     try:
-        tasks = (
-            db.query(VideoTask)
-            .filter_by(video_id=video_id, platform=platform)
-            .all()
-        )
-        for task in tasks:
-            db.delete(task)
-        db.commit()
-        logger.info(f"Task(s) deleted for video_id: {video_id} and platform: {platform}")
+        with session_scope() as db:
+            return list(db.scalars(
+                select(VideoTask.task_id).where(VideoTask.platform == platform, VideoTask.video_id == video_id)
+            ))
+    except Exception as e:
+        logger.error(f"Failed to get task ids by video: {e}")
+        return []
+
+
+# 删除任务，单条 DELETE 语句完成，返回删除的记录数
+def delete_task_by_video(video_id: str, platform: str) -> int:
+    try:
+        with session_scope() as db:
+            result = db.execute(
+                delete(VideoTask).where(VideoTask.platform == platform, VideoTask.video_id == video_id)
+            )
+        logger.info(f"{result.rowcount} task(s) deleted for video_id: {video_id} and platform: {platform}")
+        return result.rowcount
     except Exception as e:
         logger.error(f"Failed to delete task by video: {e}")
-    finally:
-        db.close()
\ No newline at end of file
+        if in_unit_of_work():
+            raise
+        return 0
+
+
+# 按 task_id 删除单条任务记录
+def delete_task_by_id(task_id: str) -> int:
+    try:
+        with session_scope() as db:
+            result = db.execute(delete(VideoTask).where(VideoTask.task_id == task_id))
+        return result.rowcount
+    except Exception as e:
+        logger.error(f"Failed to delete task {task_id}: {e}")
+        if in_unit_of_work():
+            raise
+        return 0
+
+
+def _time_ago(db: Session, seconds: int):
+    """
+    数据库时钟下 seconds 秒之前的时间。created_at 由数据库 func.now() 写入（SQLite 为 UTC），
+    用应用进程的本地时间比较会在非 UTC 时区下产生偏差
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        # 与 CURRENT_TIMESTAMP 相同的 UTC 文本格式，可直接比较
+        return func.datetime("now", f"-{int(seconds)} seconds")
+    if dialect == "mysql":
+        return func.date_sub(func.now(), text(f"INTERVAL {int(seconds)} SECOND"))
+    return func.now() - timedelta(seconds=seconds)
+
+
+# 认领一批创建超过 max_age 秒的任务，供多节点并发处理（如清理）时互不重复：
+# PostgreSQL / MySQL 下为 SELECT ... FOR UPDATE SKIP LOCKED，跳过其他节点已锁定的行，锁持续到 db 的事务结束；
+# SQLite 没有行锁（写事务本身串行），该子句会被忽略。
+# 由调用方传入 session_scope 的会话并在同一事务中处理返回的行，否则返回前锁就已释放；
+# lock=False 时只做普通查询（如清理演练），不影响其他节点
+def claim_tasks_older_than(db: Session, max_age: int, limit: int = 100, lock: bool = True) -> list[VideoTask]:
+    stmt = (
+        select(VideoTask)
+        .where(VideoTask.created_at < _time_ago(db, max_age))
+        .order_by(VideoTask.created_at)
+        .limit(limit)
+    )
+    if lock:
+        stmt = stmt.with_for_update(skip_locked=True)
+    return list(db.scalars(stmt))
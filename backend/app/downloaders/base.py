@@ -4,6 +4,7 @@ from abc import ABC, abstractmethod
 from typing import Optional, Union
 
 from app.enmus.note_enums import DownloadQuality
+from app.models.audio_model import VideoMeta
 from app.models.notes_model import AudioDownloadResult
 from os import getenv
 QUALITY_MAP = {
@@ -36,3 +37,65 @@ class Downloader(ABC):
     def download_video(self, video_url: str,
                        output_dir: Union[str, None] = None) -> str:
         pass
+
+    def probe(self, video_url: str) -> VideoMeta:
+        '''
+        只获取视频元信息（标题、时长、标签等），不下载任何媒体文件
+
+        :param video_url: 资源链接
+        :return: 返回一个 VideoMeta 类
+        '''
+        raise NotImplementedError(f"{self.__class__.__name__} 不支持元信息探测")
+
+    def expand(self, video_url: str, limit: int = 100) -> list[dict]:
+        '''
+        将合集 / 播放列表 / 多 P / 频道链接展开为单个视频链接列表，默认不展开
+
+        :param video_url: 资源链接
+        :param limit: 最多返回的条目数
+        :return: [{"url": ..., "title": ...}, ...]
+        '''
+        return [{"url": video_url, "title": None}]
+
+    @staticmethod
+    def flat_entries(info: dict, limit: int, url_template: str = None) -> list[dict]:
+        '''
+        从 yt-dlp 的 extract_flat 结果中提取子条目；非播放列表时返回自身
+
+        :param url_template: 条目只有 id 没有完整链接时用于拼接，如 "https://www.youtube.com/watch?v={id}"
+        '''
+        if info.get("_type") not in ("playlist", "multi_video"):
+            return [{"url": info.get("webpage_url") or info.get("url"), "title": info.get("title")}]
+
+        items = []
+        for entry in info.get("entries") or []:
+            if not entry:
+                continue
+            if entry.get("_type") == "playlist":
+                # 频道下的子列表（如 YouTube 的 Videos / Shorts 标签页）继续展开
+                items.extend(Downloader.flat_entries(entry, limit - len(items), url_template))
+            else:
+                url = entry.get("webpage_url") or entry.get("url")
+                if (not url or not url.startswith("http")) and url_template and entry.get("id"):
+                    url = url_template.format(id=entry["id"])
+                if url:
+                    items.append({"url": url, "title": entry.get("title")})
+            if len(items) >= limit:
+                break
+        return items[:limit]
+
+    @staticmethod
+    def trim_info(info: dict, platform: str) -> VideoMeta:
+        '''
+        将 yt-dlp 的完整 info 字典裁剪为流水线实际使用的字段
+        '''
+        return VideoMeta(
+            video_id=info.get("id"),
+            platform=platform,
+            title=info.get("title"),
+            duration=info.get("duration") or 0,
+            cover_url=info.get("thumbnail"),
+            tags=info.get("tags") or [],
+            uploader=info.get("uploader"),
+            webpage_url=info.get("webpage_url"),
+        )
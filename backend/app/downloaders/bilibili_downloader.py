@@ -1,11 +1,14 @@
 import os
+import re
 from abc import ABC
 from typing import Union, Optional
 
 import yt_dlp
 
 from app.downloaders.base import Downloader, DownloadQuality, QUALITY_MAP
+from app.models.audio_model import VideoMeta
 from app.models.notes_model import AudioDownloadResult
+from app.utils.meta_cache import meta_cache
 from app.utils.path_helper import get_data_dir
 from app.utils.url_parser import extract_video_id
 
@@ -31,6 +34,93 @@ class BilibiliDownloader(Downloader, ABC):
     def __init__(self):
         super().__init__()
 
+    @staticmethod
+    def _network_opts() -> dict:
+        """
+        构建 yt-dlp 的网络相关参数（代理、重试、UA、ffmpeg 路径等），下载与探测共用
+        """
+        retries = _env_int("YTDLP_RETRIES", 3)
+        user_agent = os.getenv(
+            "YTDLP_USER_AGENT",
+            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36",
+        )
+        opts = {
+            "retries": retries,
+            "fragment_retries": retries,
+            "nocheckcertificate": _env_bool("YTDLP_NO_CHECK_CERTIFICATE", False),
+            "http_headers": {"User-Agent": user_agent, "Referer": "https://www.bilibili.com/"},
+        }
+
+        proxy = os.getenv("YTDLP_PROXY")
+        if proxy is not None:
+            opts["proxy"] = proxy
+        socket_timeout = os.getenv("YTDLP_SOCKET_TIMEOUT")
+        if socket_timeout and socket_timeout.strip():
+            try:
+                opts["socket_timeout"] = float(socket_timeout)
+            except ValueError:
+                pass
+
+        ffmpeg_bin_path = os.getenv("FFMPEG_BIN_PATH")
+        if ffmpeg_bin_path:
+            candidate = os.path.join(ffmpeg_bin_path, "ffmpeg.exe")
+            opts["ffmpeg_location"] = candidate if os.path.isfile(candidate) else ffmpeg_bin_path
+        if _env_bool("YTDLP_FORCE_IPV4", False):
+            opts["source_address"] = "0.0.0.0"
+        return opts
+
+    @staticmethod
+    def _cache_key(video_url: str) -> Optional[str]:
+        """
+        元信息缓存键：BV 号，多 P 视频附加 _p{n}，与 yt-dlp 返回的 id 保持一致
+        """
+        video_id = extract_video_id(video_url, "bilibili")
+        if not video_id:
+            return None
+        match = re.search(r"[?&]p=(\d+)", video_url)
+        if match and int(match.group(1)) > 1:
+            return f"{video_id}_p{match.group(1)}"
+        return video_id
+
+    def probe(self, video_url: str) -> VideoMeta:
+        """
+        仅提取元信息（download=False），结果按视频 ID 写入磁盘缓存
+        """
+        cache_key = self._cache_key(video_url)
+        cached = meta_cache.get("bilibili", cache_key)
+        if cached:
+            return cached
+
+        ydl_opts = {
+            'skip_download': True,
+            'noplaylist': True,
+            'quiet': True,
+        }
+        ydl_opts.update(self._network_opts())
+
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(video_url, download=False)
+        meta = self.trim_info(info, "bilibili")
+        meta_cache.set(meta, cache_key)
+        return meta
+
+    def expand(self, video_url: str, limit: int = 100) -> list[dict]:
+        """
+        扁平提取多 P 视频、合集、UP 主空间等链接下的所有视频
+        """
+        ydl_opts = {
+            'extract_flat': 'in_playlist',
+            'skip_download': True,
+            'noplaylist': False,
+            'playlistend': limit,
+            'quiet': True,
+        }
+        ydl_opts.update(self._network_opts())
+
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(video_url, download=False)
+        return self.flat_entries(info, limit, "https://www.bilibili.com/video/{id}")
+
     def download(
         self,
         video_url: str,
@@ -46,22 +136,6 @@ class BilibiliDownloader(Downloader, ABC):
 
         output_path = os.path.join(output_dir, "%(id)s.%(ext)s")
 
-        proxy = os.getenv("YTDLP_PROXY")
-        socket_timeout = os.getenv("YTDLP_SOCKET_TIMEOUT")
-        retries = _env_int("YTDLP_RETRIES", 3)
-        no_check_cert = _env_bool("YTDLP_NO_CHECK_CERTIFICATE", False)
-        force_ipv4 = _env_bool("YTDLP_FORCE_IPV4", False)
-        user_agent = os.getenv(
-            "YTDLP_USER_AGENT",
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36",
-        )
-
-        ffmpeg_bin_path = os.getenv("FFMPEG_BIN_PATH")
-        ffmpeg_location = None
-        if ffmpeg_bin_path:
-            candidate = os.path.join(ffmpeg_bin_path, "ffmpeg.exe")
-            ffmpeg_location = candidate if os.path.isfile(candidate) else ffmpeg_bin_path
-
         ydl_opts = {
             'format': 'bestaudio[ext=m4a]/bestaudio/best',
             'outtmpl': output_path,
@@ -75,40 +149,23 @@ class BilibiliDownloader(Downloader, ABC):
             'noplaylist': True,
             'quiet': False,
         }
-
-        if proxy is not None:
-            ydl_opts["proxy"] = proxy
-        if socket_timeout and socket_timeout.strip():
-            try:
-                ydl_opts["socket_timeout"] = float(socket_timeout)
-            except ValueError:
-                pass
-
-        ydl_opts["retries"] = retries
-        ydl_opts["fragment_retries"] = retries
-        ydl_opts["nocheckcertificate"] = no_check_cert
-        ydl_opts["http_headers"] = {"User-Agent": user_agent, "Referer": "https://www.bilibili.com/"}
-        if ffmpeg_location:
-            ydl_opts["ffmpeg_location"] = ffmpeg_location
-        if force_ipv4:
-            ydl_opts["source_address"] = "0.0.0.0"
+        ydl_opts.update(self._network_opts())
 
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             info = ydl.extract_info(video_url, download=True)
-            video_id = info.get("id")
-            title = info.get("title")
-            duration = info.get("duration", 0)
-            cover_url = info.get("thumbnail")
-            audio_path = os.path.join(output_dir, f"{video_id}.mp3")
+            meta = self.trim_info(info, "bilibili")
+            audio_path = os.path.join(output_dir, f"{meta.video_id}.mp3")
+        # 下载时顺带刷新元信息缓存，只保留流水线需要的字段
+        meta_cache.set(meta, self._cache_key(video_url))
 
         return AudioDownloadResult(
             file_path=audio_path,
-            title=title,
-            duration=duration,
-            cover_url=cover_url,
+            title=meta.title,
+            duration=meta.duration,
+            cover_url=meta.cover_url,
             platform="bilibili",
-            video_id=video_id,
-            raw_info=info,
+            video_id=meta.video_id,
+            raw_info={'tags': meta.tags},
             video_path=None  # ❗音频下载不包含视频路径
         )
 
@@ -125,7 +182,8 @@ class BilibiliDownloader(Downloader, ABC):
             output_dir = get_data_dir()
         os.makedirs(output_dir, exist_ok=True)
         print("video_url",video_url)
-        video_id=extract_video_id(video_url, "bilibili")
+        # 多 P 视频的分 P 文件名为 BVxxx_p2.mp4，与 yt-dlp 的 id 保持一致
+        video_id=self._cache_key(video_url)
         video_path = os.path.join(output_dir, f"{video_id}.mp4")
         if os.path.exists(video_path):
             return video_path
@@ -135,22 +193,6 @@ class BilibiliDownloader(Downloader, ABC):
 
         output_path = os.path.join(output_dir, "%(id)s.%(ext)s")
 
-        proxy = os.getenv("YTDLP_PROXY")
-        socket_timeout = os.getenv("YTDLP_SOCKET_TIMEOUT")
-        retries = _env_int("YTDLP_RETRIES", 3)
-        no_check_cert = _env_bool("YTDLP_NO_CHECK_CERTIFICATE", False)
-        force_ipv4 = _env_bool("YTDLP_FORCE_IPV4", False)
-        user_agent = os.getenv(
-            "YTDLP_USER_AGENT",
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36",
-        )
-
-        ffmpeg_bin_path = os.getenv("FFMPEG_BIN_PATH")
-        ffmpeg_location = None
-        if ffmpeg_bin_path:
-            candidate = os.path.join(ffmpeg_bin_path, "ffmpeg.exe")
-            ffmpeg_location = candidate if os.path.isfile(candidate) else ffmpeg_bin_path
-
         ydl_opts = {
             'format': 'bv*[ext=mp4]/bestvideo+bestaudio/best',
             'outtmpl': output_path,
@@ -158,23 +200,7 @@ class BilibiliDownloader(Downloader, ABC):
             'quiet': False,
             'merge_output_format': 'mp4',  # 确保合并成 mp4
         }
-
-        if proxy is not None:
-            ydl_opts["proxy"] = proxy
-        if socket_timeout and socket_timeout.strip():
-            try:
-                ydl_opts["socket_timeout"] = float(socket_timeout)
-            except ValueError:
-                pass
-
-        ydl_opts["retries"] = retries
-        ydl_opts["fragment_retries"] = retries
-        ydl_opts["nocheckcertificate"] = no_check_cert
-        ydl_opts["http_headers"] = {"User-Agent": user_agent, "Referer": "https://www.bilibili.com/"}
-        if ffmpeg_location:
-            ydl_opts["ffmpeg_location"] = ffmpeg_location
-        if force_ipv4:
-            ydl_opts["source_address"] = "0.0.0.0"
+        ydl_opts.update(self._network_opts())
 
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             info = ydl.extract_info(video_url, download=True)
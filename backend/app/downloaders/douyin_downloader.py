@@ -2,6 +2,8 @@ import datetime
 import json
 import os
 import re
+import threading
+import time
 from typing import Union, Optional
 from urllib.parse import quote, urlencode
 
@@ -10,16 +12,24 @@ import requests
 from pydantic import BaseModel
 
 from app.downloaders.base import Downloader
-from app.downloaders.douyin_helper.abogus import ABogus
+from app.downloaders.douyin_helper.abogus_fast import FastABogus
 from app.enmus.note_enums import DownloadQuality
 from app.models.audio_model import AudioDownloadResult
 from app.services.cookie_manager import CookieConfigManager
+from app.utils.logger import get_logger
 from app.utils.path_helper import get_data_dir
+from app.utils.url_parser import resolve_short_url
 from dotenv import load_dotenv
 
 load_dotenv()
+logger = get_logger(__name__)
 DOUYIN_DOMAIN = "https://www.douyin.com"
 
+# msToken 有效期（秒），到期后重新向 mssdk 申请
+DOUYIN_MSTOKEN_TTL = int(os.getenv("DOUYIN_MSTOKEN_TTL", 3600))
+# 作品详情缓存有效期（秒），同一任务内下载音频/视频共用一次详情请求；播放地址会过期，不宜过长
+DOUYIN_DETAIL_TTL = int(os.getenv("DOUYIN_DETAIL_TTL", 600))
+
 cfm=CookieConfigManager()
 def get_timestamp(unit: str = "milli"):
     """
@@ -114,10 +124,17 @@ class DouyinDownloader(Downloader):
         super().__init__()
         self.headers_config = DouyinConfig.HEADERS.copy()
         self.headers_config["Cookie"] = cfm.get('douyin')
-        print(self.headers_config)
         self.proxies_config = DouyinConfig.PROXIES.copy()
         self.ttwid_config = DouyinConfig.TTWID.copy()
         self.ms_token_config = DouyinConfig.MS_TOKEN.copy()
+        # 复用签名器与 HTTP 连接，避免每次请求重新初始化
+        self.bogus = FastABogus()
+        self.client = httpx.Client(transport=httpx.HTTPTransport(retries=5), timeout=10.0)
+        self.session = requests.Session()
+        self._token_lock = threading.Lock()
+        self._ms_token: Optional[str] = None
+        self._ms_token_expires_at = 0.0
+        self._detail_cache: dict = {}
 
     @staticmethod
     def find_url(string: str) -> list:
@@ -128,22 +145,34 @@ class DouyinDownloader(Downloader):
         video_url = self.find_url(url)
 
         if len(video_url):
-            video_url = video_url[0]
-            try:
-                response = requests.head(video_url, allow_redirects=True)
-                url = response.url
-            except Exception as e:
-                return ""
+            url = video_url[0]
         patterns = [
             r'video/(\d+)',
             r'aweme_id=(\d+)',
         ]
-        for pattern in patterns:
-            match = re.search(pattern, url)
-            if match:
-                return match.group(1)
+        for candidate in (url, None):
+            if candidate is None:
+                # 链接中没有 ID（如 v.douyin.com 短链），跟随重定向后再匹配；解析结果由 url_parser 统一缓存
+                candidate = resolve_short_url(url)
+                if not candidate:
+                    return ""
+            for pattern in patterns:
+                match = re.search(pattern, candidate)
+                if match:
+                    return match.group(1)
         return ""
 
+    def get_ms_token(self) -> str:
+        """
+        获取缓存的 msToken，过期后才重新申请
+        """
+        with self._token_lock:
+            if self._ms_token and time.time() < self._ms_token_expires_at:
+                return self._ms_token
+            self._ms_token = self.gen_real_msToken()
+            self._ms_token_expires_at = time.time() + DOUYIN_MSTOKEN_TTL
+            return self._ms_token
+
     def gen_real_msToken(self) -> str:
         try:
             payload = json.dumps(
@@ -159,21 +188,19 @@ class DouyinDownloader(Downloader):
                 "User-Agent": self.headers_config["User-Agent"],
                 "Content-Type": "application/json",
             }
-            transport = httpx.HTTPTransport(retries=5)
-            with httpx.Client(transport=transport) as client:
-                try:
-                    response = client.post(
-                        self.ms_token_config["url"], content=payload, headers=headers
-                    )
-                    response.raise_for_status()
-
-                    msToken = str(httpx.Cookies(response.cookies).get("msToken"))
-                    if len(msToken) not in [120, 128]:
-                        raise ValueError("响应内容：{0}， Douyin msToken API 的响应内容不符合要求。".format(msToken))
-
-                    return msToken
-                except Exception as e:
-                    raise ValueError("Douyin msToken API 请求失败：{0}".format(e))
+            try:
+                response = self.client.post(
+                    self.ms_token_config["url"], content=payload, headers=headers
+                )
+                response.raise_for_status()
+
+                msToken = str(httpx.Cookies(response.cookies).get("msToken"))
+                if len(msToken) not in [120, 128]:
+                    raise ValueError("响应内容：{0}， Douyin msToken API 的响应内容不符合要求。".format(msToken))
+
+                return msToken
+            except Exception as e:
+                raise ValueError("Douyin msToken API 请求失败：{0}".format(e))
         except Exception as e:
             raise ValueError("Douyin msToken API{0}".format(e))
 
@@ -181,31 +208,33 @@ class DouyinDownloader(Downloader):
         try:
 
             aweme_id = self.extract_video_id(video_url)
+            cached = self._detail_cache.get(aweme_id)
+            if aweme_id and cached and time.time() - cached[0] < DOUYIN_DETAIL_TTL:
+                return cached[1]
+
             kwargs = self.headers_config
-            print("@kwargs:", kwargs)
             base_params = BaseRequestModel().model_dump()
-            base_params["msToken"] = self.gen_real_msToken()
+            base_params["msToken"] = self.get_ms_token()
 
             base_params["aweme_id"] = aweme_id
-            bogus = ABogus()
-            ab_value = bogus.get_value(base_params)
+            ab_value = self.bogus.get_value(base_params)
             a_bogus = quote(ab_value, safe='')
-            print("@a_bogus:", a_bogus)
-            print(base_params)
             query_str = urlencode(base_params)
             full_url = f"{DOUYIN_DOMAIN}/aweme/v1/web/aweme/detail/?{query_str}&a_bogus={a_bogus}"
 
-            print("Request URL:", full_url)
-
-
-            response = requests.get(full_url, headers=kwargs)
-
-            print("Response JSON:", response.content)
-            return response.json()
+            # 请求头含 Cookie、查询串含 msToken 与签名，日志中均不记录
+            response = self.session.get(full_url, headers=kwargs, timeout=15)
+            logger.debug(f"抖音作品详情 {aweme_id}：HTTP {response.status_code}，{len(response.content)} 字节")
+            data = response.json()
+            if aweme_id and data.get('aweme_detail'):
+                self._detail_cache = {
+                    k: v for k, v in self._detail_cache.items() if time.time() - v[0] < DOUYIN_DETAIL_TTL
+                }
+                self._detail_cache[aweme_id] = (time.time(), data)
+            return data
         except Exception as e:
-            print("请求失败:", e)
+            logger.error(f"抖音作品详情请求失败：{e}")
             raise ValueError("请求失败:", e)
-        # print(kwargs)
 
     def download(
             self,
@@ -215,9 +244,7 @@ class DouyinDownloader(Downloader):
             need_video: Optional[bool] = False
     ) -> AudioDownloadResult:
         try:
-            print(
-                f"正在下载视频: {video_url}，保存路径: {output_dir}，质量: {quality}"
-            )
+            logger.info(f"正在下载视频: {video_url}，保存路径: {output_dir}，质量: {quality}")
             if output_dir is None:
                 output_dir = get_data_dir()
             if not output_dir:
@@ -233,10 +260,9 @@ class DouyinDownloader(Downloader):
             }
             url = video_data['aweme_detail']['music']['play_url']['uri']
             # 下载音频
-            audio_data = requests.get(url)
+            audio_data = self.session.get(url)
             with open(output_path, 'wb') as f:
                 f.write(audio_data.content)
-            print(url)
             tags = []
             for tag in video_data['aweme_detail']['video_tag']:
                 if tag['tag_name']:
@@ -283,14 +309,14 @@ class DouyinDownloader(Downloader):
             }
 
             url=video_data['aweme_detail']['video']['download_addr']['url_list'][0]
-            _data = requests.get(url,allow_redirects=True,headers=self.headers_config)
+            _data = self.session.get(url,allow_redirects=True,headers=self.headers_config)
 
             with open(output_path, 'wb') as f:
                 f.write(_data.content)
 
             return output_path
         except Exception as e:
-            print("请求失败:", e)
+            logger.error(f"抖音视频下载失败：{e}")
             raise ValueError("请求失败:", e)
 
 
@@ -5,7 +5,9 @@ from typing import Union, Optional
 import yt_dlp
 
 from app.downloaders.base import Downloader, DownloadQuality
+from app.models.audio_model import VideoMeta
 from app.models.notes_model import AudioDownloadResult
+from app.utils.meta_cache import meta_cache
 from app.utils.path_helper import get_data_dir
 from app.utils.url_parser import extract_video_id
 
@@ -15,6 +17,43 @@ class YoutubeDownloader(Downloader, ABC):
 
         super().__init__()
 
+    def probe(self, video_url: str) -> VideoMeta:
+        """
+        仅提取元信息（download=False），结果按视频 ID 写入磁盘缓存
+        """
+        cache_key = extract_video_id(video_url, "youtube")
+        cached = meta_cache.get("youtube", cache_key)
+        if cached:
+            return cached
+
+        ydl_opts = {
+            'skip_download': True,
+            'noplaylist': True,
+            'quiet': True,
+        }
+
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(video_url, download=False)
+        meta = self.trim_info(info, "youtube")
+        meta_cache.set(meta, cache_key)
+        return meta
+
+    def expand(self, video_url: str, limit: int = 100) -> list[dict]:
+        """
+        扁平提取播放列表、频道链接下的所有视频
+        """
+        ydl_opts = {
+            'extract_flat': 'in_playlist',
+            'skip_download': True,
+            'noplaylist': False,
+            'playlistend': limit,
+            'quiet': True,
+        }
+
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(video_url, download=False)
+        return self.flat_entries(info, limit, "https://www.youtube.com/watch?v={id}")
+
     def download(
         self,
         video_url: str,
@@ -39,22 +78,20 @@ class YoutubeDownloader(Downloader, ABC):
 
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             info = ydl.extract_info(video_url, download=True)
-            video_id = info.get("id")
-            title = info.get("title")
-            duration = info.get("duration", 0)
-            cover_url = info.get("thumbnail")
+            meta = self.trim_info(info, "youtube")
             ext = info.get("ext", "m4a")  # 兜底用 m4a
-            audio_path = os.path.join(output_dir, f"{video_id}.{ext}")
-        print('os.path.join(output_dir, f"{video_id}.{ext}")',os.path.join(output_dir, f"{video_id}.{ext}"))
+            audio_path = os.path.join(output_dir, f"{meta.video_id}.{ext}")
+        # 下载时顺带刷新元信息缓存
+        meta_cache.set(meta, extract_video_id(video_url, "youtube"))
 
         return AudioDownloadResult(
             file_path=audio_path,
-            title=title,
-            duration=duration,
-            cover_url=cover_url,
+            title=meta.title,
+            duration=meta.duration,
+            cover_url=meta.cover_url,
             platform="youtube",
-            video_id=video_id,
-            raw_info={'tags':info.get('tags')}, #全部返回会报错
+            video_id=meta.video_id,
+            raw_info={'tags': meta.tags}, #全部返回会报错
             video_path=None  # ❗音频下载不包含视频路径
         )
 
@@ -4,10 +4,12 @@ from app.gpt.base import GPT
 from app.gpt.provider.OpenAI_compatible_provider import OpenAICompatibleProvider
 from app.gpt.universal_gpt import UniversalGPT
 from app.models.model_config import ModelConfig
+from app.utils.image_payload import resolve_vision_profile
 
 
 class GPTFactory:
     @staticmethod
     def from_config(config: ModelConfig) -> GPT:
         client = OpenAICompatibleProvider(api_key=config.api_key, base_url=config.base_url).get_client
-        return UniversalGPT(client=client, model=config.model_name)
\ No newline at end of file
+        return UniversalGPT(client=client, model=config.model_name,
+                            vision_profile=resolve_vision_profile(config.model_name, config.base_url))
\ No newline at end of file
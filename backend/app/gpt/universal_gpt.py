@@ -3,20 +3,22 @@ from app.gpt.prompt_builder import generate_base_prompt
 from app.models.gpt_model import GPTSource
 from app.gpt.prompt import BASE_PROMPT, AI_SUM, SCREENSHOT, LINK
 from app.gpt.utils import fix_markdown
-from app.models.transcriber_model import TranscriptSegment
+from app.models.transcriber_model import TranscriptSegment, TranscriptSegments
+from app.utils.image_payload import VisionProfile, optimize_image_urls, resolve_vision_profile
 from app.utils.logger import get_logger
 from datetime import timedelta
-from typing import List
+from typing import List, Optional
 
 
 logger = get_logger(__name__)
 
 
 class UniversalGPT(GPT):
-    def __init__(self, client, model: str, temperature: float = 0.7):
+    def __init__(self, client, model: str, temperature: float = 0.7, vision_profile: Optional[VisionProfile] = None):
         self.client = client
         self.model = model
         self.temperature = temperature
+        self.vision_profile = vision_profile or resolve_vision_profile(model)
         self.screenshot = False
         self.link = False
 
@@ -24,13 +26,11 @@ class UniversalGPT(GPT):
         return str(timedelta(seconds=int(seconds)))[2:]
 
     def _build_segment_text(self, segments: List[TranscriptSegment]) -> str:
-        return "\n".join(
-            f"{self._format_time(seg.start)} - {seg.text.strip()}"
-            for seg in segments
-        )
+        return TranscriptSegments.from_segments(segments).to_prompt_text()
 
-    def ensure_segments_type(self, segments) -> List[TranscriptSegment]:
-        return [TranscriptSegment(**seg) if isinstance(seg, dict) else seg for seg in segments]
+    def ensure_segments_type(self, segments) -> TranscriptSegments:
+        # 已是 TranscriptSegments 时原样返回，不再逐段重建
+        return TranscriptSegments.from_segments(segments)
 
     def create_messages(self, segments: List[TranscriptSegment], **kwargs):
 
@@ -45,7 +45,12 @@ class UniversalGPT(GPT):
 
         # ⛳ 组装 content 数组，支持 text + image_url 混合
         content = [{"type": "text", "text": content_text}]
-        video_img_urls = kwargs.get('video_img_urls', [])
+        video_img_urls, report = optimize_image_urls(kwargs.get('video_img_urls') or [], self.vision_profile)
+        if report.images:
+            logger.info(
+                f"图片载荷优化 ({self.vision_profile.name})：{report.images} 张，"
+                f"{report.original_bytes} -> {report.optimized_bytes} 字节，节省 {report.saved_bytes} 字节，尺寸 {report.sizes}"
+            )
 
         for url in video_img_urls:
             content.append({
@@ -1,5 +1,5 @@
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import List, Optional
 
 
 @dataclass
@@ -10,6 +10,17 @@ class AudioDownloadResult:
     cover_url: Optional[str]     # 视频封面图
     platform: str                # 平台，如 "bilibili"
     video_id: str                # 唯一视频ID
-    raw_info: dict               # yt-dlp 的原始 info 字典
+    raw_info: dict               # 精简后的平台元信息（如 tags），不再保存完整 yt-dlp info
     video_path: Optional[str] = None  #  新增字段：可选视频文件路径
 
+
+@dataclass
+class VideoMeta:
+    video_id: str                # 唯一视频ID
+    platform: str                # 平台，如 "bilibili"
+    title: str                   # 视频标题
+    duration: float              # 视频时长（秒）
+    cover_url: Optional[str]     # 视频封面图
+    tags: List[str] = field(default_factory=list)  # 视频标签
+    uploader: Optional[str] = None  # 作者 / UP 主
+    webpage_url: Optional[str] = None  # 规范化后的视频页面地址
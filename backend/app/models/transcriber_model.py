@@ -1,16 +1,128 @@
 
+import bisect
+from array import array
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional, Sequence, Union, overload
 
-@dataclass
+@dataclass(slots=True)
 class TranscriptSegment:
     start: float               # 开始时间（秒）
     end: float                 # 结束时间（秒）
     text: str                  # 该段文字
 
+
+class TranscriptSegments(Sequence[TranscriptSegment]):
+    """
+    以并行数组（start / end / text）存储的分段列表，长转写下比逐个 TranscriptSegment 对象省内存。
+    下标访问时才生成 TranscriptSegment；切片与按时间截取共享底层数组，不复制数据。
+    """
+    __slots__ = ("_starts", "_ends", "_texts", "_lo", "_hi")
+
+    def __init__(self, starts: array, ends: array, texts: List[str], lo: int = 0, hi: Optional[int] = None):
+        self._starts = starts
+        self._ends = ends
+        self._texts = texts
+        self._lo = lo
+        self._hi = len(texts) if hi is None else hi
+
+    @classmethod
+    def from_segments(cls, segments: Iterable[Union[TranscriptSegment, dict]]) -> "TranscriptSegments":
+        if isinstance(segments, TranscriptSegments):
+            return segments
+        starts, ends, texts = array("d"), array("d"), []
+        for seg in segments:
+            if isinstance(seg, dict):
+                seg = TranscriptSegment(**seg)
+            starts.append(seg.start)
+            ends.append(seg.end)
+            texts.append(seg.text)
+        return cls(starts, ends, texts)
+
+    @classmethod
+    def concat(cls, parts: Iterable["TranscriptSegments"]) -> "TranscriptSegments":
+        """拼接多段（如分片转写后再合并），各段需已按时间排好序"""
+        starts, ends, texts = array("d"), array("d"), []
+        for part in parts:
+            starts.extend(part.starts)
+            ends.extend(part.ends)
+            texts.extend(part.texts)
+        return cls(starts, ends, texts)
+
+    def __len__(self) -> int:
+        return self._hi - self._lo
+
+    @overload
+    def __getitem__(self, index: int) -> TranscriptSegment: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "TranscriptSegments": ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            lo, hi, step = index.indices(len(self))
+            if step != 1:
+                return TranscriptSegments.from_segments(self[i] for i in range(lo, hi, step))
+            return TranscriptSegments(self._starts, self._ends, self._texts, self._lo + lo, self._lo + max(lo, hi))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("segment index out of range")
+        i = self._lo + index
+        return TranscriptSegment(start=self._starts[i], end=self._ends[i], text=self._texts[i])
+
+    def __iter__(self) -> Iterator[TranscriptSegment]:
+        for start, end, text in zip(self.starts, self.ends, self.texts):
+            yield TranscriptSegment(start=start, end=end, text=text)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (TranscriptSegments, list)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"TranscriptSegments(len={len(self)})"
+
+    @property
+    def starts(self) -> memoryview:
+        return memoryview(self._starts)[self._lo:self._hi]
+
+    @property
+    def ends(self) -> memoryview:
+        return memoryview(self._ends)[self._lo:self._hi]
+
+    @property
+    def texts(self) -> List[str]:
+        return self._texts[self._lo:self._hi]
+
+    def slice_time(self, start: float, end: float) -> "TranscriptSegments":
+        """与时间段 [start, end) 有重叠的分段，O(log n)，共享底层数组"""
+        lo = bisect.bisect_right(self._ends, start, self._lo, self._hi)
+        hi = bisect.bisect_left(self._starts, end, self._lo, self._hi)
+        return TranscriptSegments(self._starts, self._ends, self._texts, lo, max(lo, hi))
+
+    def shifted(self, offset: float) -> "TranscriptSegments":
+        """整体平移时间轴（如把分片内的相对时间换算为全片时间），返回新的实例"""
+        add = float(offset).__add__
+        return TranscriptSegments(array("d", map(add, self.starts)), array("d", map(add, self.ends)), self.texts)
+
+    def to_list(self) -> List[TranscriptSegment]:
+        return list(self)
+
+    def to_prompt_text(self) -> str:
+        """
+        生成提示词中的转写文本，每行 "MM:SS - 文本"。
+        与按段 str(timedelta(seconds=int(t)))[2:] 的结果一致，但不为每段创建 timedelta。
+        """
+        def stamp(start: float) -> str:
+            hours, rest = divmod(int(start), 3600)
+            return f"{hours}:{rest // 60:02d}:{rest % 60:02d}"[2:]
+
+        return "\n".join([f"{stamp(start)} - {text.strip()}" for start, text in zip(self.starts, self.texts)])
+
+
 @dataclass
 class TranscriptResult:
     language: Optional[str]         # 检测语言（如 "zh"、"en"）
     full_text: str                  # 完整合并后的文本（用于摘要）
-    segments: List[TranscriptSegment]  # 分段结构，适合前端显示时间轴字幕等
-    raw: Optional[dict] = None      # 原始响应数据，便于调试或平台特性处理
\ No newline at end of file
+    segments: Union[List[TranscriptSegment], TranscriptSegments]  # 分段结构，适合前端显示时间轴字幕等
+    raw: Optional[dict] = None      # 原始响应数据，便于调试或平台特性处理
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Optional
+from dataclasses import asdict
 from app.utils.response import ResponseWrapper as R
 
 from app.services.cookie_manager import CookieConfigManager
+from app.utils.janitor import janitor
 from ffmpeg_helper import ensure_ffmpeg_or_raise
 
 router = APIRouter()
@@ -42,4 +44,16 @@ async def sys_health():
 
 @router.get("/sys_check")
 async def sys_check():
-    return R.success()
\ No newline at end of file
+    return R.success()
+
+
+@router.get("/storage_report")
+def storage_report():
+    """磁盘占用与按当前策略将被清理的文件（演练，不删除）"""
+    return R.success(asdict(janitor.run(dry_run=True)))
+
+
+@router.post("/storage_cleanup")
+def storage_cleanup():
+    """立即按当前策略执行一次清理"""
+    return R.success(asdict(janitor.run()))
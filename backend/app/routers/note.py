@@ -1,4 +1,5 @@
 # app/routers/note.py
+import hashlib
 import json
 import os
 import uuid
@@ -7,21 +8,31 @@ from typing import Optional
 from urllib.parse import urlparse
 
 from fastapi import APIRouter, HTTPException, BackgroundTasks, UploadFile, File
-from pydantic import BaseModel, validator, field_validator
+from pydantic import BaseModel, Field, validator, field_validator, model_validator
 from dataclasses import asdict
 
-from app.db.video_task_dao import get_task_by_video, delete_task_by_video
+from app.db.video_task_dao import get_task_by_video, delete_task_by_video, get_task_ids_by_video
 from app.enmus.exception import NoteErrorEnum
 from app.enmus.note_enums import DownloadQuality
 from app.exceptions.note import NoteError
+from app.services.constant import SUPPORT_PLATFORM_MAP
 from app.services.note import NoteGenerator, logger
+from app.utils.artifact_writer import read_json, status_writer, write_json
+from app.utils.image_proxy import ImageFetchError, image_proxy as remote_image_proxy
 from app.utils.logger import get_logger
+from app.utils.note_artifacts import (
+    RESULT_FIELDS,
+    load_note_result,
+    load_summary,
+    load_transcript_page,
+    save_note_result,
+)
 from app.utils.response import ResponseWrapper as R
-from app.utils.url_parser import extract_video_id
-from app.validators.video_url_validator import is_supported_video_url
+from app.utils.url_parser import extract_video_id_async
+from app.validators.video_url_validator import is_supported_video_url, is_supported_batch_url
 from fastapi import APIRouter, Request, HTTPException
-from fastapi.responses import StreamingResponse
-import httpx
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
 from app.enmus.task_status_enums import TaskStatus
 
 # from app.services.downloader import download_raw_audio
@@ -34,6 +45,7 @@ status_logger = get_logger(__name__)
 class RecordRequest(BaseModel):
     video_id: str
     platform: str
+    task_id: Optional[str] = None
 
 
 class VideoRequest(BaseModel):
@@ -65,14 +77,52 @@ class VideoRequest(BaseModel):
         return v
 
 
+class BatchRequest(VideoRequest):
+    # 最多展开的视频数，不超过 BATCH_MAX_ITEMS
+    max_items: Optional[int] = Field(None, ge=1)
+
+    @field_validator("video_url")
+    def validate_supported_url(cls, v):
+        if not is_supported_batch_url(str(v)):
+            raise NoteError(code=NoteErrorEnum.PLATFORM_NOT_SUPPORTED.code,
+                            message=NoteErrorEnum.PLATFORM_NOT_SUPPORTED.message)
+        return v
+
+    @model_validator(mode="after")
+    def validate_platform_matches_url(self):
+        # 链接域名必须属于所选平台，否则会用错误的下载器展开
+        if not is_supported_batch_url(str(self.video_url), self.platform):
+            raise NoteError(code=NoteErrorEnum.PLATFORM_NOT_SUPPORTED.code,
+                            message=NoteErrorEnum.PLATFORM_NOT_SUPPORTED.message)
+        return self
+
+
 NOTE_OUTPUT_DIR = os.getenv("NOTE_OUTPUT_DIR", "note_results")
 UPLOAD_DIR = "uploads"
+# 转写分段分页接口单页最大条数
+TRANSCRIPT_PAGE_MAX = 2000
+# 单次批量任务最多展开的视频数
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", 100))
 
 
 def save_note_to_file(task_id: str, note):
-    os.makedirs(NOTE_OUTPUT_DIR, exist_ok=True)
-    with open(os.path.join(NOTE_OUTPUT_DIR, f"{task_id}.json"), "w", encoding="utf-8") as f:
-        json.dump(asdict(note), f, ensure_ascii=False, indent=2)
+    if not save_note_result(task_id, note):
+        # 本节点可以正常读取结果，但其他节点拿不到，在任务状态中提示
+        status_writer.write(os.path.join(NOTE_OUTPUT_DIR, f"{task_id}.status.json"), {
+            "status": TaskStatus.SUCCESS.value,
+            "message": "笔记已生成，但同步到共享存储失败，其他节点暂时无法读取",
+        }, final=True)
+
+
+def save_batch_manifest(batch_id: str, manifest: dict):
+    write_json(os.path.join(NOTE_OUTPUT_DIR, f"{batch_id}.batch.json"), manifest)
+
+
+def load_batch_manifest(batch_id: str) -> Optional[dict]:
+    try:
+        return read_json(os.path.join(NOTE_OUTPUT_DIR, f"{batch_id}.batch.json"))
+    except FileNotFoundError:
+        return None
 
 
 def run_note_task(task_id: str, video_url: str, platform: str, quality: DownloadQuality,
@@ -113,6 +163,8 @@ def delete_task(data: RecordRequest):
     try:
         # TODO: 待持久化完成
         # NoteGenerator().delete_note(video_id=data.video_id, platform=data.platform)
+        task_ids = [data.task_id] if data.task_id else get_task_ids_by_video(data.video_id, data.platform)
+        NoteGenerator.release_note_images(data.video_id, data.platform, task_ids)
         return R.success(msg='删除成功')
     except Exception as e:
         return R.error(msg=e)
@@ -131,10 +183,10 @@ async def upload(file: UploadFile = File(...)):
 
 
 @router.post("/generate_note")
-def generate_note(data: VideoRequest, background_tasks: BackgroundTasks):
+async def generate_note(data: VideoRequest, background_tasks: BackgroundTasks):
     try:
-
-        video_id = extract_video_id(data.video_url, data.platform)
+        # 短链解析走异步连接池，数据库/状态文件读写放到线程池，避免阻塞事件循环
+        video_id = await extract_video_id_async(data.video_url, data.platform)
         # if not video_id:
         #     raise HTTPException(status_code=400, detail="无法提取视频 ID")
         # existing = get_task_by_video(video_id, data.platform)
@@ -144,9 +196,9 @@ def generate_note(data: VideoRequest, background_tasks: BackgroundTasks):
         #
         #     )
         if not data.task_id:
-            existing_task_id = get_task_by_video(video_id, data.platform)
+            existing_task_id = await run_in_threadpool(get_task_by_video, video_id, data.platform)
             if existing_task_id:
-                status = NoteGenerator.get_task_status(existing_task_id)
+                status = await run_in_threadpool(NoteGenerator.get_task_status, existing_task_id)
                 # 如果已有任务且未失败，则直接复用
                 if status != TaskStatus.FAILED.value:
                     status_value = status or TaskStatus.PENDING.value
@@ -157,12 +209,12 @@ def generate_note(data: VideoRequest, background_tasks: BackgroundTasks):
                     }, msg="检测到已存在的任务，直接返回结果")
 
                 # 若之前任务失败，则清理记录后重新创建
-                delete_task_by_video(video_id, data.platform)
+                await run_in_threadpool(delete_task_by_video, video_id, data.platform)
         if data.task_id:
             # 如果传了task_id，说明是重试！
             task_id = data.task_id
             # 更新之前的状态
-            NoteGenerator()._update_status(task_id, TaskStatus.PENDING)
+            await run_in_threadpool(NoteGenerator()._update_status, task_id, TaskStatus.PENDING)
             logger.info(f"重试模式，复用已有 task_id={task_id}")
         else:
             # 正常新建任务
@@ -176,93 +228,201 @@ def generate_note(data: VideoRequest, background_tasks: BackgroundTasks):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/task_status/{task_id}")
-def get_task_status(task_id: str):
+@router.get("/video_meta")
+def get_video_meta(video_url: str, platform: str):
+    """
+    仅探测视频元信息（标题、时长、封面、标签），不下载媒体，结果带磁盘缓存
+    """
+    if urlparse(video_url).scheme in ("http", "https") and not is_supported_video_url(video_url):
+        raise NoteError(code=NoteErrorEnum.PLATFORM_NOT_SUPPORTED.code,
+                        message=NoteErrorEnum.PLATFORM_NOT_SUPPORTED.message)
+    downloader = SUPPORT_PLATFORM_MAP.get(platform)
+    if not downloader:
+        raise NoteError(code=NoteErrorEnum.PLATFORM_NOT_SUPPORTED.code,
+                        message=NoteErrorEnum.PLATFORM_NOT_SUPPORTED.message)
+    try:
+        meta = downloader.probe(video_url)
+        return R.success(asdict(meta))
+    except NotImplementedError as e:
+        return R.error(msg=str(e))
+    except Exception as e:
+        return R.error(msg=f"获取视频信息失败: {e}")
+
+
+@router.post("/generate_batch")
+def generate_batch(data: BatchRequest, background_tasks: BackgroundTasks):
+    """
+    将合集 / 多 P / 播放列表 / 频道链接展开为多个子任务，共享模型与笔记参数，依次排队执行
+    """
+    downloader = SUPPORT_PLATFORM_MAP.get(data.platform)
+    if not downloader:
+        raise NoteError(code=NoteErrorEnum.PLATFORM_NOT_SUPPORTED.code,
+                        message=NoteErrorEnum.PLATFORM_NOT_SUPPORTED.message)
+
+    limit = min(data.max_items or BATCH_MAX_ITEMS, BATCH_MAX_ITEMS)
+    try:
+        entries = downloader.expand(data.video_url, limit)
+    except Exception as e:
+        return R.error(msg=f"解析合集失败: {e}")
+    if not entries:
+        return R.error(msg="未解析到任何视频")
+
+    batch_id = str(uuid.uuid4())
+    generator = NoteGenerator()
+    children = []
+    for entry in entries:
+        task_id = str(uuid.uuid4())
+        generator._update_status(task_id, TaskStatus.PENDING)
+        background_tasks.add_task(run_note_task, task_id, entry["url"], data.platform, data.quality, data.link,
+                                  data.screenshot, data.model_name, data.provider_id, data.format, data.style,
+                                  data.extras, data.video_understanding, data.video_interval, data.grid_size)
+        children.append({"task_id": task_id, "video_url": entry["url"], "title": entry.get("title")})
+
+    save_batch_manifest(batch_id, {
+        "batch_id": batch_id,
+        "video_url": data.video_url,
+        "platform": data.platform,
+        "children": children,
+    })
+    logger.info(f"批量任务已创建 batch_id={batch_id}, 共 {len(children)} 个子任务")
+    return R.success({"batch_id": batch_id, "total": len(children), "children": children})
+
+
+@router.get("/batch_status/{batch_id}")
+def get_batch_status(batch_id: str):
+    manifest = load_batch_manifest(batch_id)
+    if not manifest:
+        return R.error(msg="批量任务不存在", code=404)
+
+    children = manifest.get("children", [])
+    counts = {}
+    for child in children:
+        child["status"] = NoteGenerator.get_task_status(child["task_id"]) or TaskStatus.PENDING.value
+        counts[child["status"]] = counts.get(child["status"], 0) + 1
+
+    finished = counts.get(TaskStatus.SUCCESS.value, 0) + counts.get(TaskStatus.FAILED.value, 0)
+    total = len(children)
+    return R.success({
+        "batch_id": batch_id,
+        "total": total,
+        "finished": finished,
+        "progress": round(finished / total, 4) if total else 1.0,
+        "counts": counts,
+        "children": children,
+    })
+
+
+def etag_response(request: Request, data: dict):
+    """带 ETag 的 R.success：内容未变化时返回 304，轮询方不必重复下载同样的结果"""
+    body = json.dumps({"code": 0, "msg": "success", "data": data}, ensure_ascii=False, sort_keys=True)
+    etag = f'"{hashlib.md5(body.encode("utf-8")).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("If-None-Match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def build_task_status(task_id: str) -> dict:
     status_path = os.path.join(NOTE_OUTPUT_DIR, f"{task_id}.status.json")
-    result_path = os.path.join(NOTE_OUTPUT_DIR, f"{task_id}.json")
 
-    # 优先读状态文件
-    if os.path.exists(status_path):
-        with open(status_path, "r", encoding="utf-8") as f:
-            status_content = json.load(f)
+    # 优先读状态（同进程内取内存中的最新值，否则读状态文件）
+    status_content = status_writer.read(status_path)
+    if status_content is not None:
 
         status = status_content.get("status")
         message = status_content.get("message", "")
 
         if status == TaskStatus.SUCCESS.value:
-            # 成功状态的话，继续读取最终笔记内容
-            if os.path.exists(result_path):
-                with open(result_path, "r", encoding="utf-8") as rf:
-                    result_content = json.load(rf)
-                return R.success({
+            # 成功状态只返回结果摘要，Markdown 与转写分段通过 /task_result、/task_transcript 获取
+            summary = load_summary(task_id)
+            if summary is not None:
+                return {
                     "status": status,
-                    "result": result_content,
+                    "result": summary,
                     "message": message,
                     "task_id": task_id
-                })
+                }
             else:
                 # 理论上不会出现，保险处理
-                return R.success({
+                return {
                     "status": TaskStatus.PENDING.value,
                     "message": "任务完成，但结果文件未找到",
                     "task_id": task_id
-                })
+                }
 
         if status == TaskStatus.FAILED.value:
             status_logger.error(f"任务 {task_id} 失败: {message}")
-            return R.success({
+            return {
                 "status": TaskStatus.FAILED.value,
                 "message": message or "任务失败",
                 "task_id": task_id
-            })
+            }
 
         # 处理中状态
-        return R.success({
+        return {
             "status": status,
             "message": message,
             "task_id": task_id
-        })
+        }
 
     # 没有状态文件，但有结果
-    if os.path.exists(result_path):
-        with open(result_path, "r", encoding="utf-8") as f:
-            result_content = json.load(f)
-        return R.success({
+    summary = load_summary(task_id)
+    if summary is not None:
+        return {
             "status": TaskStatus.SUCCESS.value,
-            "result": result_content,
+            "result": summary,
             "task_id": task_id
-        })
+        }
 
     # 什么都没有，默认PENDING
-    return R.success({
+    return {
         "status": TaskStatus.PENDING.value,
         "message": "任务排队中",
         "task_id": task_id
-    })
+    }
+
+
+@router.get("/task_status/{task_id}")
+def get_task_status(task_id: str, request: Request):
+    return etag_response(request, build_task_status(task_id))
+
+
+@router.get("/task_result/{task_id}")
+def get_task_result(task_id: str, request: Request, fields: str = "markdown,audio_meta,transcript"):
+    """
+    读取笔记结果，fields 逗号分隔，可选 markdown / audio_meta / transcript（转写摘要）
+    """
+    selected = [f.strip() for f in fields.split(",") if f.strip() in RESULT_FIELDS]
+    result = load_note_result(task_id, selected)
+    if result is None:
+        return R.error(msg="结果不存在", code=404)
+    return etag_response(request, result)
+
+
+@router.get("/task_transcript/{task_id}")
+def get_task_transcript(task_id: str, request: Request, offset: int = 0, limit: int = 500,
+                        start: Optional[float] = None, end: Optional[float] = None):
+    """分页读取转写分段，limit 最大 TRANSCRIPT_PAGE_MAX；start / end（秒）可按时间段筛选"""
+    page = load_transcript_page(task_id, max(offset, 0), min(max(limit, 1), TRANSCRIPT_PAGE_MAX), start, end)
+    if page is None:
+        return R.error(msg="结果不存在", code=404)
+    return etag_response(request, page)
 
 
 @router.get("/image_proxy")
 async def image_proxy(request: Request, url: str):
-    headers = {
-        "Referer": "https://www.bilibili.com/",
-        "User-Agent": request.headers.get("User-Agent", ""),
-    }
+    if not url.startswith(("http://", "https://")):
+        raise HTTPException(status_code=400, detail="不支持的图片地址")
 
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get(url, headers=headers)
-
-            if resp.status_code != 200:
-                raise HTTPException(status_code=resp.status_code, detail="图片获取失败")
-
-            content_type = resp.headers.get("Content-Type", "image/jpeg")
-            return StreamingResponse(
-                resp.aiter_bytes(),
-                media_type=content_type,
-                headers={
-                    "Cache-Control": "public, max-age=86400",  #  缓存一天
-                    "Content-Type": content_type,
-                }
-            )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        meta, data = await remote_image_proxy.fetch(url, request.headers.get("User-Agent", ""))
+    except ImageFetchError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+    headers = {
+        "Cache-Control": "public, max-age=86400",  #  缓存一天
+        "ETag": meta.client_etag,
+    }
+    if request.headers.get("If-None-Match") == meta.client_etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type=meta.content_type, headers=headers)
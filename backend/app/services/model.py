@@ -2,14 +2,14 @@
 
 from typing import Any
 
-from app.db.model_dao import insert_model, get_all_models, get_model_by_provider_and_name, delete_model
-from app.db.provider_dao import get_enabled_providers
+from app.db.model_dao import insert_model, delete_model
 from app.enmus.exception import ProviderErrorEnum
 from app.exceptions.provider import ProviderError
 from app.gpt.gpt_factory import GPTFactory
 from app.gpt.provider.OpenAI_compatible_provider import OpenAICompatibleProvider
 from app.models.model_config import ModelConfig
 from app.services.provider import ProviderService
+from app.utils.config_cache import config_cache
 from app.utils.logger import get_logger
 
 logger=get_logger(__name__)
@@ -83,7 +83,7 @@ class ModelService:
     @staticmethod
     def get_all_models(verbose: bool = False):
         try:
-            raw_models = get_all_models()
+            raw_models = config_cache.get_all_models()
             if verbose:
                 print(f"所有模型列表: {raw_models}")
             return ModelService._format_models(raw_models)
@@ -93,7 +93,7 @@ class ModelService:
     @staticmethod
     def get_all_models_safe(verbose: bool = False):
         try:
-            raw_models = get_all_models()
+            raw_models = config_cache.get_all_models()
             if verbose:
                 print(f"所有模型列表: {raw_models}")
             return ModelService._format_models(raw_models)
@@ -116,9 +116,7 @@ class ModelService:
         return formatted
     @staticmethod
     def get_enabled_models_by_provider( provider_id: str|int,):
-        from app.db.model_dao import get_models_by_provider
-
-        all_models = get_models_by_provider(provider_id)
+        all_models = config_cache.get_models(str(provider_id))
         enabled_models = all_models
         return enabled_models
     @staticmethod
@@ -189,7 +187,7 @@ class ModelService:
                 return False
 
             # 查询是否已存在同名模型
-            existing = get_model_by_provider_and_name(provider_id, model_name)
+            existing = config_cache.get_model(provider_id, model_name)
             if existing:
                 print(f"模型 {model_name} 已存在于供应商ID {provider_id} 下，跳过插入")
                 return False
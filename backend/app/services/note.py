@@ -2,6 +2,7 @@ import json
 import logging
 import os
 import re
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import asdict
 from pathlib import Path
 from typing import List, Optional, Tuple, Union, Any
@@ -34,8 +35,12 @@ from app.transcriber.base import Transcriber
 from app.transcriber.transcriber_provider import get_transcriber, _transcribers
 from app.utils.note_helper import replace_content_markers, generate_toc_with_anchors
 from app.utils.status_code import StatusCode
-from app.utils.video_helper import generate_screenshot
-from app.utils.video_reader import VideoReader
+from app.utils.artifact_writer import read_json, status_writer, write_json, write_text
+from app.utils.transcript_store import read_transcript, write_transcript
+from app.utils.image_store import image_store
+from app.utils.path_helper import get_app_dir
+from app.utils.video_helper import cache_remote_cover, clear_screenshot_cache, generate_screenshots, is_static_url
+from app.utils.video_reader import FrameIndex, VideoReader
 
 # ------------------ 环境变量与全局配置 ------------------
 
@@ -53,11 +58,27 @@ NOTE_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 IMAGE_OUTPUT_DIR = os.getenv("OUT_DIR", "./static/screenshots")
 # 图片基础 URL（用于生成 Markdown 中的图片链接，需前端静态目录对应）
 IMAGE_BASE_URL = os.getenv("IMAGE_BASE_URL", "/static/screenshots")
+# 按 (视频, 时间戳) 缓存的原始截图，发布到笔记前会存入内容寻址的 image_store
+SCREENSHOT_CACHE_DIR = get_app_dir("screenshot_cache")
+# 视频理解抽帧时仅解码关键帧（更快，但帧时间对齐到关键帧）
+VIDEO_KEYFRAMES_ONLY = os.getenv("VIDEO_KEYFRAMES_ONLY", "false").lower() in {"1", "true", "yes", "y", "on"}
+# 视频理解采样方式：fixed 按固定间隔取帧，scene 按画面变化取帧
+VIDEO_FRAME_SAMPLING = os.getenv("VIDEO_FRAME_SAMPLING", "fixed")
+# 场景变化阈值（64 位感知哈希的汉明距离）与网格图数量上限（0 表示不限制）
+VIDEO_SCENE_THRESHOLD = int(os.getenv("VIDEO_SCENE_THRESHOLD", 10))
+VIDEO_MAX_GRIDS = int(os.getenv("VIDEO_MAX_GRIDS", 0)) or None
+# 截图时间戳与视频理解阶段已采样帧的最大允许偏差（秒），超出则用 ffmpeg 重新截取
+SCREENSHOT_SNAP_TOLERANCE = float(os.getenv("SCREENSHOT_SNAP_TOLERANCE", 2))
+# GPT 输出中的截图标记：*Screenshot-[mm:ss]
+SCREENSHOT_PATTERN = re.compile(r'\*?Screenshot(?:-\[(\d{1,2}:\d{1,2})\])?')
 
 # 日志配置
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# 封面预取线程池：与音频/视频下载并行拉取并缓存封面
+_cover_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cover")
+
 
 class NoteGenerator:
     """
@@ -72,6 +93,7 @@ class NoteGenerator:
         self.transcriber: Transcriber = self._init_transcriber()
         self.video_path: Optional[Path] = None
         self.video_img_urls=[]
+        self.frame_index: Optional[FrameIndex] = None
         logger.info("NoteGenerator 初始化完成")
 
 
@@ -129,7 +151,7 @@ class NoteGenerator:
 
             # 缓存文件路径
             audio_cache_file = NOTE_OUTPUT_DIR / f"{task_id}_audio.json"
-            transcript_cache_file = NOTE_OUTPUT_DIR / f"{task_id}_transcript.json"
+            transcript_cache_file = NOTE_OUTPUT_DIR / f"{task_id}_transcript.bin"
             markdown_cache_file = NOTE_OUTPUT_DIR / f"{task_id}_markdown.md"
             print(audio_cache_file)
             # 1. 下载音频/视频
@@ -176,6 +198,7 @@ class NoteGenerator:
                     formats=_format,
                     audio_meta=audio_meta,
                     platform=platform,
+                    task_id=task_id,
                 )
 
             # 5. 保存记录到数据库
@@ -191,6 +214,8 @@ class NoteGenerator:
             logger.error(f"生成笔记流程异常 (task_id={task_id})：{exc}", exc_info=True)
             self._update_status(task_id, TaskStatus.FAILED, message=str(exc))
             return None
+        finally:
+            self._release_frame_index()
 
     @staticmethod
     def delete_note(video_id: str, platform: str) -> int:
@@ -204,8 +229,28 @@ class NoteGenerator:
         logger.info(f"删除笔记记录 (video_id={video_id}, platform={platform})")
         return delete_task_by_video(video_id, platform)
 
+    @staticmethod
+    def release_note_images(video_id: str, platform: str, task_ids: List[str]) -> int:
+        """
+        删除笔记时释放其截图引用，回收不再被任何笔记引用的图片，并清理该视频的截图缓存
+
+        :return: 删除的图片文件数
+        """
+        removed = 0
+        for task_id in task_ids:
+            removed += image_store.release(task_id)
+        clear_screenshot_cache(SCREENSHOT_CACHE_DIR, f"{platform}_{video_id}")
+        logger.info(f"已释放笔记截图 (video_id={video_id}, platform={platform})，删除 {removed} 个文件")
+        return removed
+
     # ---------------- 私有方法 ----------------
 
+    def _release_frame_index(self) -> None:
+        """删除视频理解阶段落盘的帧"""
+        if self.frame_index is not None:
+            self.frame_index.cleanup()
+            self.frame_index = None
+
     @staticmethod
     def get_task_status(task_id: str) -> Optional[str]:
         """读取状态文件，返回任务状态字符串。"""
@@ -213,12 +258,9 @@ class NoteGenerator:
             return None
 
         status_file = NOTE_OUTPUT_DIR / f"{task_id}.status.json"
-        if not status_file.exists():
-            return None
-
         try:
-            data = json.loads(status_file.read_text(encoding="utf-8"))
-            status = data.get("status")
+            data = status_writer.read(status_file)
+            status = data.get("status") if data else None
             if status:
                 return status
         except Exception as exc:
@@ -292,33 +334,15 @@ class NoteGenerator:
         if not task_id:
             return
 
-        NOTE_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
         status_file = NOTE_OUTPUT_DIR / f"{task_id}.status.json"
         print(f"写入状态文件: {status_file} 当前状态: {status}")
         data = {"status": status.value if isinstance(status, TaskStatus) else status}
         if message:
             data["message"] = message
 
-        try:
-            # First create a temporary file
-            temp_file = status_file.with_suffix('.tmp')
-
-            # Write to temporary file
-            with temp_file.open('w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-
-            # Atomic rename operation
-            temp_file.replace(status_file)
-
-            print(f"状态文件写入成功: {status_file}")
-        except Exception as e:
-            logger.error(f"写入状态文件失败 (task_id={task_id})：{e}")
-            # Try to write error to file directly as fallback
-            try:
-                with status_file.open('w', encoding='utf-8') as f:
-                    f.write(f"Error writing status: {str(e)}")
-            except:
-                logger.error(f"写入错误  {e}")
+        # 连续的中间状态合并写入，终态（成功 / 失败）立即落盘
+        final = data["status"] in (TaskStatus.SUCCESS.value, TaskStatus.FAILED.value)
+        status_writer.write(status_file, data, final=final)
 
     def _handle_exception(self, task_id, exc):
         logger.error(f"任务异常 (task_id={task_id})", exc_info=True)
@@ -367,6 +391,9 @@ class NoteGenerator:
 
 
 
+        self._release_frame_index()
+        cover_future = self._prefetch_cover(downloader, video_url, platform) if not audio_cache_file.exists() else None
+
         # 判断是否需要下载视频
         need_video = screenshot or video_understanding
         if need_video:
@@ -378,14 +405,21 @@ class NoteGenerator:
 
                 # 若指定了 grid_size，则生成缩略图
                 if grid_size:
-                    self.video_img_urls=VideoReader(
+                    with VideoReader(
                         video_path=str(self.video_path),
                         grid_size=tuple(grid_size),
                         frame_interval=video_interval,
                         unit_width=1280,
                         unit_height=720,
                         save_quality=90,
-                    ).run()
+                        keyframes_only=VIDEO_KEYFRAMES_ONLY,
+                        sampling=VIDEO_FRAME_SAMPLING,
+                        scene_threshold=VIDEO_SCENE_THRESHOLD,
+                        max_grids=VIDEO_MAX_GRIDS,
+                        index_frames=screenshot,
+                    ) as reader:
+                        self.video_img_urls = reader.run()
+                        self.frame_index = reader.frame_index
                 else:
                     logger.info("未指定 grid_size，跳过缩略图生成")
             except Exception as exc:
@@ -397,7 +431,7 @@ class NoteGenerator:
         if audio_cache_file.exists():
             logger.info(f"检测到音频缓存 ({audio_cache_file})，直接读取")
             try:
-                data = json.loads(audio_cache_file.read_text(encoding="utf-8"))
+                data = read_json(audio_cache_file)
                 return AudioDownloadResult(**data)
             except Exception as e:
                 logger.warning(f"读取音频缓存失败，将重新下载：{e}")
@@ -410,8 +444,9 @@ class NoteGenerator:
                 output_dir=output_path,
                 need_video=need_video,
             )
+            audio.cover_url = self._resolve_cover(cover_future, audio.cover_url, platform)
             # 缓存 audio 元信息到本地 JSON
-            audio_cache_file.write_text(json.dumps(asdict(audio), ensure_ascii=False, indent=2), encoding="utf-8")
+            write_json(audio_cache_file, asdict(audio))
             logger.info(f"音频下载并缓存成功 ({audio_cache_file})")
             return audio
         except Exception as exc:
@@ -420,6 +455,33 @@ class NoteGenerator:
             raise
 
 
+    @staticmethod
+    def _prefetch_cover(downloader: Downloader, video_url: Union[str, HttpUrl], platform: str) -> Optional[Future]:
+        """
+        后台探测元信息并缓存封面，与媒体下载并行；下载器不支持 probe 时返回 None，下载后再补拉
+        """
+        def fetch() -> Optional[str]:
+            try:
+                meta = downloader.probe(str(video_url))
+            except NotImplementedError:
+                return None
+            return cache_remote_cover(meta.cover_url, platform)
+
+        return _cover_executor.submit(fetch)
+
+    @staticmethod
+    def _resolve_cover(cover_future: Optional[Future], cover_url: Optional[str], platform: str) -> Optional[str]:
+        """返回本地封面地址，预取失败时回退为下载结果中的远程地址"""
+        if not cover_url or is_static_url(cover_url):
+            return cover_url
+        local_url = None
+        if cover_future is not None:
+            try:
+                local_url = cover_future.result(timeout=30)
+            except Exception as e:
+                logger.warning(f"封面预取失败：{e}")
+        return local_url or cache_remote_cover(cover_url, platform) or cover_url
+
     def _transcribe_audio(
         self,
         audio_file: str,
@@ -442,17 +504,20 @@ class NoteGenerator:
         if transcript_cache_file.exists():
             logger.info(f"检测到转写缓存 ({transcript_cache_file})，尝试读取")
             try:
-                data = json.loads(transcript_cache_file.read_text(encoding="utf-8"))
-                segments = [TranscriptSegment(**seg) for seg in data.get("segments", [])]
-                return TranscriptResult(language=data["language"], full_text=data["full_text"], segments=segments)
+                return read_transcript(transcript_cache_file)
             except Exception as e:
                 logger.warning(f"加载转写缓存失败，将重新转写：{e}")
+        else:
+            transcript = self._migrate_legacy_transcript(transcript_cache_file)
+            if transcript is not None:
+                return transcript
 
         # 调用转写器
         try:
             logger.info("开始转写音频")
             transcript = self.transcriber.transcript(file_path=audio_file)
-            transcript_cache_file.write_text(json.dumps(asdict(transcript), ensure_ascii=False, indent=2), encoding="utf-8")
+            # 转写缓存只在重试时整体读取一次，较大时压缩存储
+            write_transcript(transcript_cache_file, transcript, compress=True)
             logger.info(f"转写并缓存成功 ({transcript_cache_file})")
             return transcript
         except Exception as exc:
@@ -460,6 +525,24 @@ class NoteGenerator:
             self._handle_exception(task_id, exc)
             raise
 
+    @staticmethod
+    def _migrate_legacy_transcript(transcript_cache_file: Path) -> Optional[TranscriptResult]:
+        """旧版本把转写缓存写在 {task_id}_transcript.json，读取后转存为新格式并删除旧文件，避免重试时重新转写"""
+        legacy_file = transcript_cache_file.with_suffix(".json")
+        if not legacy_file.exists():
+            return None
+        try:
+            data = json.loads(legacy_file.read_text(encoding="utf-8"))
+            segments = [TranscriptSegment(**seg) for seg in data.get("segments", [])]
+            transcript = TranscriptResult(language=data["language"], full_text=data["full_text"], segments=segments)
+            write_transcript(transcript_cache_file, transcript, compress=True)
+        except Exception as e:
+            logger.warning(f"迁移旧版转写缓存失败，将重新转写：{e}")
+            return None
+        legacy_file.unlink(missing_ok=True)
+        logger.info(f"已迁移旧版转写缓存 ({legacy_file})")
+        return transcript
+
     def _summarize_text(
         self,
         audio_meta: AudioDownloadResult,
@@ -505,7 +588,7 @@ class NoteGenerator:
 
         try:
             markdown = gpt.summarize(source)
-            markdown_cache_file.write_text(markdown, encoding="utf-8")
+            write_text(markdown_cache_file, markdown)
             logger.info(f"GPT 总结并缓存成功 ({markdown_cache_file})")
             return markdown
         except Exception as exc:
@@ -513,29 +596,57 @@ class NoteGenerator:
             self._handle_exception(task_id, exc)
             raise
 
-    def _insert_screenshots(self, markdown: str, video_path: Path) -> str | None:
+    def _insert_screenshots(self, markdown: str, video_path: Path, cache_key: str,
+                            task_id: Optional[str] = None) -> str:
         """
         扫描 Markdown 文本中所有 Screenshot 标记，并替换为实际生成的截图链接。
+        相同时间戳只截一次图；开启视频理解时优先复用已采样的帧，其余截图并行生成，
+        标记在一次正则替换中完成；截图失败的标记保持原样。
+        截图存入内容寻址的 image_store，并登记为 task_id 的引用。
 
         :param markdown: Markdown 文本
         :param video_path: 视频文件路径
+        :param cache_key: 截图缓存键（平台 + 视频 ID），同一视频同一时间戳的截图会被复用
+        :param task_id: 任务 ID，删除笔记时据此释放截图
         :return: 替换后的 Markdown 文本
         """
         matches: List[Tuple[str, int]] = self._extract_screenshot_timestamps(markdown)
-        for idx, (marker, ts) in enumerate(matches):
-            try:
-                img_path = Path(generate_screenshot(str(video_path), str(IMAGE_OUTPUT_DIR), ts, idx)).resolve()
-                filename = img_path.name
-                web_url = f"{IMAGE_BASE_URL.rstrip('/')}/{filename}"
-                absolute_path = img_path.as_posix()
-
-                # 写入前端可渲染的 URL，并附带本地绝对路径注释，便于导出时替换
-                replacement = f"![]({web_url})<!--LOCAL_PATH:{absolute_path}-->"
-                markdown = markdown.replace(marker, replacement, 1)
-            except Exception as exc:
-                logger.error(f"生成截图失败 (timestamp={ts})：{exc}")
-                return None
-        return markdown
+        if not matches:
+            return markdown
+
+        frame_index = self.frame_index
+        frame_source = (lambda ts: frame_index.lookup(ts, SCREENSHOT_SNAP_TOLERANCE)) if frame_index else None
+        screenshots = generate_screenshots(
+            str(video_path), SCREENSHOT_CACHE_DIR, (ts for _, ts in matches), cache_key,
+            frame_source=frame_source,
+        )
+        logger.info(f"截图完成：{len(matches)} 个标记，{len(screenshots)} 张图片")
+
+        replacements = {}
+        digests = set()
+        for ts, path in screenshots.items():
+            stored = image_store.put_file(path)
+            digests.add(stored.digest)
+            # 写入前端可渲染的 URL，并附带本地绝对路径注释，便于导出时替换
+            replacements[ts] = f"![]({stored.display_url})<!--LOCAL_PATH:{stored.path.resolve().as_posix()}-->"
+        if task_id and digests:
+            image_store.add_refs(task_id, digests)
+
+        def _replace(match: re.Match) -> str:
+            ts = self._parse_screenshot_timestamp(match.group(1))
+            if ts not in replacements:
+                logger.error(f"生成截图失败 (timestamp={ts})")
+                return match.group(0)
+            return replacements[ts]
+
+        return SCREENSHOT_PATTERN.sub(_replace, markdown)
+
+    @staticmethod
+    def _parse_screenshot_timestamp(timestamp: Optional[str]) -> int:
+        if not timestamp:
+            return 0
+        minutes, seconds = map(int, timestamp.split(':'))
+        return minutes * 60 + seconds
 
     @staticmethod
     def _extract_screenshot_timestamps(markdown: str) -> List[Tuple[str, int]]:
@@ -546,17 +657,10 @@ class NoteGenerator:
         :param markdown: Markdown 文本
         :return: 标记和时间戳的列表
         """
-        pattern = r'\*?Screenshot(?:-\[(\d{1,2}:\d{1,2})\])?'
-        results = []
-        for match in re.finditer(pattern, markdown):
-            timestamp = match.group(1)
-            if timestamp:
-                minutes, seconds = map(int, timestamp.split(':'))
-                total_seconds = minutes * 60 + seconds
-            else:
-                total_seconds = 0
-            results.append((match.group(0), total_seconds))
-        return results
+        return [
+            (match.group(0), NoteGenerator._parse_screenshot_timestamp(match.group(1)))
+            for match in SCREENSHOT_PATTERN.finditer(markdown)
+        ]
 
     def _post_process_markdown(
         self,
@@ -565,6 +669,7 @@ class NoteGenerator:
         formats: List[str],
         audio_meta: AudioDownloadResult,
         platform: str,
+        task_id: Optional[str] = None,
     ) -> str:
         """
         对生成的 Markdown 做后期处理：插入截图和/或插入链接，生成目录。
@@ -574,6 +679,7 @@ class NoteGenerator:
         :param formats: 包含 'link'、'screenshot'、'toc' 的列表
         :param audio_meta: AudioDownloadResult 元信息
         :param platform: 平台标识
+        :param task_id: 任务 ID，用于登记笔记引用的截图
         :return: 处理后的 Markdown 文本
         """
         # 处理原片跳转链接
@@ -609,7 +715,7 @@ class NoteGenerator:
         
         # 处理截图
         if 'screenshot' in formats and video_path:
-            markdown = self._insert_screenshots(markdown, video_path)
+            markdown = self._insert_screenshots(markdown, video_path, f"{platform}_{audio_meta.video_id}", task_id)
         
         return markdown
 
@@ -1,6 +1,7 @@
 from fastapi.encoders import jsonable_encoder
 import uuid
 
+from app.db.engine import session_scope
 from app.db.models.providers import Provider
 from app.db.provider_dao import (
     insert_provider,
@@ -9,11 +10,11 @@ from app.db.provider_dao import (
     get_provider_by_id,
     update_provider,
     delete_provider as dao_delete_provider,
-    get_enabled_providers,
 )
 from app.db.model_dao import delete_models_by_provider
 from app.gpt.gpt_factory import GPTFactory
 from app.models.model_config import ModelConfig
+from app.utils.config_cache import config_cache
 
 
 class ProviderService:
@@ -80,21 +81,22 @@ class ProviderService:
             # 如果已存在同名且非内置的供应商，则直接更新
             from app.db.provider_dao import get_provider_by_name as dao_get_provider_by_name
             from app.db.provider_dao import update_provider as dao_update_provider
-            existing = dao_get_provider_by_name(name)
-            if existing and existing.type != 'built-in':
-                dao_update_provider(
-                    existing.id,
-                    name=name,
-                    api_key=api_key,
-                    base_url=base_url,
-                    logo=logo,
-                    type=type_,
-                    enabled=enabled,
-                )
-                return existing.id
-
-            id = str(uuid.uuid4())
-            result = insert_provider(id, name, api_key, base_url, logo, type_, enabled)
+            with session_scope():
+                existing = dao_get_provider_by_name(name)
+                if existing and existing.type != 'built-in':
+                    dao_update_provider(
+                        existing.id,
+                        name=name,
+                        api_key=api_key,
+                        base_url=base_url,
+                        logo=logo,
+                        type=type_,
+                        enabled=enabled,
+                    )
+                    return existing.id
+
+                id = str(uuid.uuid4())
+                result = insert_provider(id, name, api_key, base_url, logo, type_, enabled)
             if not result:
                 raise Exception('创建供应商失败')
             return result
@@ -102,7 +104,9 @@ class ProviderService:
             print('创建供应商失败',e)
             raise
     @staticmethod
-    def provider_to_dict(p: Provider):
+    def provider_to_dict(p: Provider | dict):
+        if isinstance(p, dict):
+            return p
         return {
             "id": p.id,
             "name": p.name,
@@ -115,32 +119,27 @@ class ProviderService:
         }
     @staticmethod
     def get_all_providers():
-        rows = get_all_providers()
-        if rows is None:
-            return []
+        rows = config_cache.get_all_providers()
 
         return [ProviderService.serialize_provider(row) for row in rows] if rows else []
     @staticmethod
     def get_all_providers_safe():
-        rows = get_all_providers()
+        rows = config_cache.get_all_providers()
 
         return [ProviderService.serialize_provider(row) for row in rows] if (rows) else []
     @staticmethod
     def get_provider_by_name(name: str):
-        from app.db.provider_dao import get_provider_by_name as dao_get_provider_by_name
-        row = dao_get_provider_by_name(name)
+        row = config_cache.get_provider_by_name(name)
         return ProviderService.serialize_provider(row)
 
     @staticmethod
     def get_provider_by_id(id: str):  # 已改为 str 类型
-        from app.db.provider_dao import get_provider_by_id as dao_get_provider_by_id
-        row = dao_get_provider_by_id(id)
+        row = config_cache.get_provider(id)
         return ProviderService.serialize_provider(row)
 
     @staticmethod
     def get_provider_by_id_safe(id: str):  # 已改为 str 类型
-        from app.db.provider_dao import get_provider_by_id as dao_get_provider_by_id
-        row = dao_get_provider_by_id(id)
+        row = config_cache.get_provider(id)
         return ProviderService.serialize_provider_safe(row)
             # all_models.extend(provider['models'])
 
@@ -169,7 +168,8 @@ class ProviderService:
         if provider.type == 'built-in':
             raise ValueError('内置模型供应商不支持删除')
 
-        # 删除关联模型
-        delete_models_by_provider(id)
-        dao_delete_provider(id)
+        # 删除关联模型与供应商放在同一事务中
+        with session_scope():
+            delete_models_by_provider(id)
+            dao_delete_provider(id)
         return True
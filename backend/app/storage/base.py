@@ -0,0 +1,81 @@
+import os
+import shutil
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, Union
+
+# 流式读写的分块大小
+CHUNK_SIZE = 1024 * 1024
+
+
+class Storage(ABC):
+    """
+    产物存储（笔记 Markdown、转写、截图等），以 "/" 分隔的相对路径作为 key，如 note_results/xxx.note.md。
+
+    本地目录始终是工作副本：写入方先落盘再 mirror() 到存储，读取方本地缺失时 ensure_local() 回源下载，
+    因此本地目录同时充当远程存储的读穿缓存。LocalStorage 下两者都是空操作。
+    """
+
+    # 是否为远程存储（多节点共享）；本地存储时调用方可跳过同步
+    remote: bool = False
+
+    @abstractmethod
+    def put_stream(self, key: str, stream: BinaryIO, content_type: Optional[str] = None) -> None:
+        """从文件对象流式写入，不把整个文件读进内存"""
+
+    @abstractmethod
+    def open(self, key: str) -> BinaryIO:
+        """流式读取，key 不存在时抛出 FileNotFoundError；调用方负责 close"""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        pass
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """删除 key，不存在时忽略"""
+
+    def url(self, key: str, expires: Optional[int] = None) -> Optional[str]:
+        """可直接访问的 URL（远程存储为预签名 URL）；不支持时返回 None，由调用方使用自己的静态地址"""
+        return None
+
+    def put_file(self, key: str, path: Union[str, Path], content_type: Optional[str] = None) -> None:
+        with open(path, "rb") as f:
+            self.put_stream(key, f, content_type)
+
+    def iter_chunks(self, key: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        with self.open(key) as f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+
+    def download(self, key: str, path: Union[str, Path]) -> bool:
+        """下载到本地路径（先写临时文件再替换），key 不存在时返回 False"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.part")
+        try:
+            with self.open(key) as src, open(temp_path, "wb") as dst:
+                shutil.copyfileobj(src, dst, CHUNK_SIZE)
+        except FileNotFoundError:
+            temp_path.unlink(missing_ok=True)
+            return False
+        temp_path.replace(path)
+        return True
+
+    # ---------------- 本地工作副本同步 ----------------
+
+    def mirror(self, path: Union[str, Path], key: str, content_type: Optional[str] = None) -> None:
+        """把本地生成的文件同步到存储（本地存储时为空操作）"""
+        if self.remote:
+            self.put_file(key, path, content_type)
+
+    def ensure_local(self, key: str, path: Union[str, Path]) -> bool:
+        """保证本地存在该文件，缺失时从远程存储下载；返回文件是否可用"""
+        if Path(path).exists():
+            return True
+        return self.remote and self.download(key, path)
+
+    def remove(self, key: str) -> None:
+        """删除存储中的副本（本地存储时为空操作，本地文件由调用方自行删除）"""
+        if self.remote:
+            self.delete(key)
@@ -0,0 +1,40 @@
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import BinaryIO, Optional, Union
+
+from app.storage.base import CHUNK_SIZE, Storage
+
+
+class LocalStorage(Storage):
+    """本地文件系统存储，key 映射为 root 下的相对路径（单机部署的默认实现）"""
+
+    remote = False
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root).resolve()
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        # 防止 "../" 越出存储根目录
+        if not path.is_relative_to(self.root):
+            raise ValueError(f"非法的存储 key：{key}")
+        return path
+
+    def put_stream(self, key: str, stream: BinaryIO, content_type: Optional[str] = None) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.part")
+        with open(temp_path, "wb") as f:
+            shutil.copyfileobj(stream, f, CHUNK_SIZE)
+        temp_path.replace(path)
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self._path(key), "rb")
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).is_file()
+
+    def delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
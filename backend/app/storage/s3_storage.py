@@ -0,0 +1,82 @@
+from typing import BinaryIO, Optional
+
+from app.storage.base import Storage
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_NOT_FOUND_CODES = {"404", "NoSuchKey", "NotFound"}
+
+
+class S3Storage(Storage):
+    """
+    S3 兼容对象存储（AWS S3、MinIO、R2、OSS 等），依赖可选安装的 boto3。
+    上传走 upload_fileobj（大文件自动分片，流式读取），下载返回流式的 Body。
+    """
+
+    remote = True
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None,
+                 region: Optional[str] = None, access_key: Optional[str] = None,
+                 secret_key: Optional[str] = None, presign_expires: int = 3600):
+        try:
+            import boto3
+            from botocore.config import Config
+            from botocore.exceptions import ClientError
+        except ImportError as e:
+            raise RuntimeError("使用 S3 存储需要安装 boto3：pip install boto3") from e
+
+        if not bucket:
+            raise ValueError("S3 存储未配置 bucket（S3_BUCKET）")
+        self.bucket = bucket
+        self.prefix = f"{prefix.strip('/')}/" if prefix.strip("/") else ""
+        self.presign_expires = presign_expires
+        self._client_error = ClientError
+        self._client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url or None,
+            region_name=region or None,
+            aws_access_key_id=access_key or None,
+            aws_secret_access_key=secret_key or None,
+            # 自建 MinIO 等通常不支持虚拟主机风格的 bucket 域名
+            config=Config(signature_version="s3v4", s3={"addressing_style": "path" if endpoint_url else "auto"}),
+        )
+        logger.info(f"使用 S3 存储：bucket={bucket}, prefix={self.prefix or '/'}, endpoint={endpoint_url or 'aws'}")
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key.lstrip('/')}"
+
+    def _is_not_found(self, error: Exception) -> bool:
+        return isinstance(error, self._client_error) and \
+            str(error.response.get("Error", {}).get("Code")) in _NOT_FOUND_CODES
+
+    def put_stream(self, key: str, stream: BinaryIO, content_type: Optional[str] = None) -> None:
+        extra_args = {"ContentType": content_type} if content_type else None
+        self._client.upload_fileobj(stream, self.bucket, self._key(key), ExtraArgs=extra_args)
+
+    def open(self, key: str) -> BinaryIO:
+        try:
+            return self._client.get_object(Bucket=self.bucket, Key=self._key(key))["Body"]
+        except Exception as e:
+            if self._is_not_found(e):
+                raise FileNotFoundError(key) from e
+            raise
+
+    def exists(self, key: str) -> bool:
+        try:
+            self._client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except Exception as e:
+            if self._is_not_found(e):
+                return False
+            raise
+
+    def delete(self, key: str) -> None:
+        self._client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def url(self, key: str, expires: Optional[int] = None) -> Optional[str]:
+        return self._client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self._key(key)},
+            ExpiresIn=expires or self.presign_expires,
+        )
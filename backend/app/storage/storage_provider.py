@@ -0,0 +1,51 @@
+import os
+import threading
+from typing import Optional
+
+from app.storage.base import Storage
+from app.storage.local_storage import LocalStorage
+from app.utils.logger import get_logger
+from app.utils.path_helper import get_app_dir
+
+logger = get_logger(__name__)
+
+# 产物存储后端：local（默认，单机）/ s3（S3 兼容对象存储，多节点共享）
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local").lower()
+S3_BUCKET = os.getenv("S3_BUCKET", "")
+S3_PREFIX = os.getenv("S3_PREFIX", "bilinote")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL", "")
+S3_REGION = os.getenv("S3_REGION", "")
+S3_ACCESS_KEY_ID = os.getenv("S3_ACCESS_KEY_ID", "")
+S3_SECRET_ACCESS_KEY = os.getenv("S3_SECRET_ACCESS_KEY", "")
+# 截图预签名 URL 有效期（秒）
+S3_PRESIGN_EXPIRES = int(os.getenv("S3_PRESIGN_EXPIRES", 3600))
+
+_storage: Optional[Storage] = None
+_lock = threading.Lock()
+
+
+def _create_storage() -> Storage:
+    if STORAGE_BACKEND == "s3":
+        from app.storage.s3_storage import S3Storage
+        return S3Storage(
+            bucket=S3_BUCKET,
+            prefix=S3_PREFIX,
+            endpoint_url=S3_ENDPOINT_URL,
+            region=S3_REGION,
+            access_key=S3_ACCESS_KEY_ID,
+            secret_key=S3_SECRET_ACCESS_KEY,
+            presign_expires=S3_PRESIGN_EXPIRES,
+        )
+    if STORAGE_BACKEND != "local":
+        logger.warning(f"未知的存储后端 {STORAGE_BACKEND}，使用本地存储")
+    return LocalStorage(get_app_dir("storage"))
+
+
+def get_storage() -> Storage:
+    """返回全局存储实例（首次调用时按 STORAGE_BACKEND 创建）"""
+    global _storage
+    if _storage is None:
+        with _lock:
+            if _storage is None:
+                _storage = _create_storage()
+    return _storage
@@ -0,0 +1,193 @@
+"""
+任务缓存与产物的统一写入：
+  - 原子写：写同目录临时文件 → fsync → rename，崩溃时只会留下旧文件或完整的新文件，不会出现截断的缓存
+  - 可选 zstd 压缩（需 pip install zstandard），读取时按魔数自动识别，压缩与否对调用方透明
+  - 状态文件合并写入：相同状态不重复写，连续的中间状态在短时间内只落盘最后一次
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Union
+
+from app.utils.logger import get_logger
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = get_logger(__name__)
+
+# 写入后是否 fsync（关闭后掉电可能丢失最近写入，但仍不会留下截断文件）
+ARTIFACT_FSYNC = os.getenv("ARTIFACT_FSYNC", "true").lower() == "true"
+# 大文件压缩：zstd / none；未安装 zstandard 时自动不压缩
+ARTIFACT_COMPRESSION = os.getenv("ARTIFACT_COMPRESSION", "zstd").lower()
+ARTIFACT_COMPRESS_MIN_BYTES = int(os.getenv("ARTIFACT_COMPRESS_MIN_BYTES", 256 * 1024))
+ARTIFACT_ZSTD_LEVEL = int(os.getenv("ARTIFACT_ZSTD_LEVEL", 3))
+# 中间状态最短落盘间隔（秒），期间的多次变更只写最后一次；终态立即写入
+STATUS_FLUSH_INTERVAL = float(os.getenv("STATUS_FLUSH_INTERVAL", 1))
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+if ARTIFACT_COMPRESSION == "zstd" and zstandard is None:
+    logger.warning("ARTIFACT_COMPRESSION=zstd 但未安装 zstandard，缓存将不压缩写入（pip install zstandard）")
+
+PathLike = Union[str, Path]
+
+
+def compression_enabled(size: int) -> bool:
+    return ARTIFACT_COMPRESSION == "zstd" and zstandard is not None and size >= ARTIFACT_COMPRESS_MIN_BYTES
+
+
+def fsync_dir(directory: PathLike) -> None:
+    """让目录中的 rename 落盘（Windows 不支持打开目录，直接跳过）"""
+    if os.name == "nt":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def atomic_open(path: PathLike, fsync: bool = ARTIFACT_FSYNC, sync_dir: bool = True) -> Iterator[BinaryIO]:
+    """
+    以二进制方式写入 path 的临时文件，正常退出后原子替换；出错时删除临时文件，原文件不受影响。
+    连续写多个文件时可传 sync_dir=False，最后统一调用一次 fsync_dir。
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(temp_path, "wb") as f:
+            yield f
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    if fsync and sync_dir:
+        fsync_dir(path.parent)
+
+
+@contextmanager
+def compressed(f: BinaryIO, enabled: bool) -> Iterator[BinaryIO]:
+    """enabled 时返回写入 f 的 zstd 压缩流（单个 frame），否则原样返回 f"""
+    if not enabled:
+        yield f
+        return
+    writer = zstandard.ZstdCompressor(level=ARTIFACT_ZSTD_LEVEL).stream_writer(f, closefd=False)
+    yield writer
+    writer.flush(zstandard.FLUSH_FRAME)
+
+
+def write_bytes(path: PathLike, data: bytes, compress: bool = False, **kwargs) -> None:
+    with atomic_open(path, **kwargs) as f, compressed(f, compress and compression_enabled(len(data))) as out:
+        out.write(data)
+
+
+def write_text(path: PathLike, text: str, compress: bool = False, **kwargs) -> None:
+    write_bytes(path, text.encode("utf-8"), compress=compress, **kwargs)
+
+
+def write_json(path: PathLike, data: Any, **kwargs) -> None:
+    write_text(path, json.dumps(data, ensure_ascii=False, separators=(",", ":")), **kwargs)
+
+
+def decompress(data: bytes) -> bytes:
+    if not data.startswith(ZSTD_MAGIC):
+        return data
+    if zstandard is None:
+        raise ValueError("文件为 zstd 压缩格式，但未安装 zstandard")
+    return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+
+def read_bytes(path: PathLike) -> bytes:
+    return decompress(Path(path).read_bytes())
+
+
+def read_text(path: PathLike) -> str:
+    return read_bytes(path).decode("utf-8")
+
+
+def read_json(path: PathLike) -> Any:
+    return json.loads(read_bytes(path))
+
+
+class StatusWriter:
+    """
+    任务状态文件的合并写入。
+    最新状态保存在内存中，同进程内的读取直接返回内存中的值；
+    与上次相同的状态不再写入，中间状态在 STATUS_FLUSH_INTERVAL 内只落盘最后一次，终态立即写入并 fsync。
+    """
+
+    def __init__(self, interval: float = STATUS_FLUSH_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._latest: Dict[Path, dict] = {}
+        self._written: Dict[Path, dict] = {}
+        self._last_flush: Dict[Path, float] = {}
+        self._timers: Dict[Path, threading.Timer] = {}
+
+    def write(self, path: PathLike, data: dict, final: bool = False) -> None:
+        path = Path(path)
+        with self._lock:
+            self._latest[path] = data
+            if self._written.get(path) == data and not final:
+                return
+            timer = self._timers.pop(path, None)
+            if timer:
+                timer.cancel()
+            wait = self._last_flush.get(path, 0) + self.interval - time.monotonic()
+            if not final and wait > 0:
+                timer = threading.Timer(wait, self.flush, args=(path,))
+                timer.daemon = True
+                self._timers[path] = timer
+                timer.start()
+                return
+        self.flush(path, final=final)
+
+    def flush(self, path: PathLike, final: bool = False) -> None:
+        path = Path(path)
+        with self._lock:
+            data = self._latest.get(path)
+            self._timers.pop(path, None)
+            if data is None:
+                return
+            try:
+                write_json(path, data, fsync=final and ARTIFACT_FSYNC)
+            except OSError as e:
+                logger.error(f"写入状态文件失败 ({path})：{e}")
+                return
+            self._last_flush[path] = time.monotonic()
+            self._written[path] = data
+            if final:
+                # 终态之后不会再有更新，释放内存（重试时会重新写入）
+                for store in (self._latest, self._written, self._last_flush):
+                    store.pop(path, None)
+
+    def read(self, path: PathLike) -> Optional[dict]:
+        path = Path(path)
+        with self._lock:
+            data = self._latest.get(path)
+        if data is not None:
+            return dict(data)
+        try:
+            return read_json(path)
+        except FileNotFoundError:
+            return None
+
+    def flush_all(self) -> None:
+        with self._lock:
+            paths = list(self._timers)
+        for path in paths:
+            self.flush(path)
+
+
+status_writer = StatusWriter()
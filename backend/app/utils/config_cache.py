@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from app.db.engine import SessionLocal
+from app.db.models.models import Model
+from app.db.models.providers import Provider
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+PROVIDER_FIELDS = ("id", "name", "logo", "type", "api_key", "base_url", "enabled", "created_at")
+# 缓存有效期（秒）：失效通知只在本进程内生效，多 worker / 多节点部署时其他进程的修改最多延迟这么久可见
+CONFIG_CACHE_TTL = float(os.getenv("CONFIG_CACHE_TTL", 30))
+
+
+class ConfigCache:
+    """
+    供应商与模型配置的进程内缓存。
+    首次读取时一次性加载全部供应商和模型，之后的读取不再访问数据库；
+    写操作提交后调用 invalidate() 递增版本号并清空，下次读取重新加载。
+    加载期间若版本号变化（有并发写入），本次结果不写入缓存，避免缓存旧数据。
+    其他进程写入的修改无法通知到本进程，缓存超过 ttl 秒后重新加载。
+    """
+
+    def __init__(self, ttl: float = CONFIG_CACHE_TTL):
+        self.ttl = ttl
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._version = 0
+        self._providers: Optional[Dict[str, dict]] = None
+        self._models: Optional[Dict[str, List[dict]]] = None
+        self._listeners: List[Callable[[int], None]] = []
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def subscribe(self, listener: Callable[[int], None]) -> None:
+        """注册配置变更通知，回调参数为新的版本号"""
+        self._listeners.append(listener)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._version += 1
+            self._providers = None
+            self._models = None
+            version = self._version
+        logger.info(f"供应商 / 模型配置已变更，缓存失效 (version={version})")
+        for listener in list(self._listeners):
+            try:
+                listener(version)
+            except Exception as e:
+                logger.warning(f"配置变更通知失败：{e}")
+
+    def _load(self) -> tuple[Dict[str, dict], Dict[str, List[dict]]]:
+        providers, models = self._providers, self._models
+        fresh = not self.ttl or time.monotonic() - self._loaded_at < self.ttl
+        if providers is not None and models is not None and fresh:
+            return providers, models
+
+        version = self._version
+        # 使用独立会话，避免在外层事务中读到尚未提交的修改
+        with SessionLocal() as db:
+            providers = {
+                row.id: {field: getattr(row, field) for field in PROVIDER_FIELDS}
+                for row in db.query(Provider).all()
+            }
+            models = {}
+            for row in db.query(Model).order_by(Model.id).all():
+                models.setdefault(row.provider_id, []).append({
+                    "id": row.id,
+                    "provider_id": row.provider_id,
+                    "model_name": row.model_name,
+                    "created_at": row.created_at,
+                })
+
+        with self._lock:
+            if self._version == version:
+                self._providers, self._models = providers, models
+                self._loaded_at = time.monotonic()
+        return providers, models
+
+    # ---------------- 供应商 ----------------
+
+    def get_provider(self, provider_id: str) -> Optional[dict]:
+        provider = self._load()[0].get(provider_id)
+        return dict(provider) if provider else None
+
+    def get_provider_by_name(self, name: str) -> Optional[dict]:
+        for provider in self._load()[0].values():
+            if provider["name"] == name:
+                return dict(provider)
+        return None
+
+    def get_all_providers(self, enabled_only: bool = False) -> List[dict]:
+        return [dict(p) for p in self._load()[0].values() if not enabled_only or p["enabled"] == 1]
+
+    # ---------------- 模型 ----------------
+
+    def get_models(self, provider_id: str) -> List[dict]:
+        return [dict(m) for m in self._load()[1].get(provider_id, [])]
+
+    def get_all_models(self) -> List[dict]:
+        models = [dict(m) for models in self._load()[1].values() for m in models]
+        return sorted(models, key=lambda m: m["id"])
+
+    def get_model(self, provider_id: str, model_name: str) -> Optional[dict]:
+        for model in self._load()[1].get(provider_id, []):
+            if model["model_name"] == model_name:
+                return dict(model)
+        return None
+
+
+config_cache = ConfigCache()
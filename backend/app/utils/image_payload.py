@@ -0,0 +1,156 @@
+import base64
+import binascii
+import io
+import os
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from PIL import Image, features
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 单次请求中所有图片（base64 后）的字节预算，默认 4MB
+VISION_PAYLOAD_MAX_BYTES = int(os.getenv("VISION_PAYLOAD_MAX_BYTES", 4 * 1024 * 1024))
+# 首轮编码质量，超预算时按 QUALITY_STEPS 逐级降低
+VISION_IMAGE_QUALITY = int(os.getenv("VISION_IMAGE_QUALITY", 80))
+
+QUALITY_STEPS = (VISION_IMAGE_QUALITY, 65, 50, 40)
+# 降质仍超预算时，每轮把边长缩小到 SCALE_STEP 倍，长边不低于 MIN_LONG_EDGE
+SCALE_STEP = 0.8
+MIN_LONG_EDGE = 512
+
+_WEBP_AVAILABLE = features.check("webp")
+
+
+@dataclass
+class VisionProfile:
+    """
+    模型服务端实际使用的图片分辨率上限：超过的部分会被服务端缩小，上传也是白传。
+    """
+    name: str
+    max_long_edge: int
+    max_short_edge: Optional[int] = None
+    max_pixels: Optional[int] = None
+    image_format: str = "JPEG"
+
+
+VISION_PROFILES = {
+    # high detail：先缩放到 2048x2048 以内，再把短边缩到 768
+    "openai": VisionProfile("openai", max_long_edge=2048, max_short_edge=768, image_format="WEBP"),
+    # 长边超过 1568 或约 1.15MP 会被缩小
+    "claude": VisionProfile("claude", max_long_edge=1568, max_pixels=1_150_000, image_format="WEBP"),
+    "gemini": VisionProfile("gemini", max_long_edge=3072, image_format="WEBP"),
+    # DashScope 默认 max_pixels = 1280 * 28 * 28
+    "qwen": VisionProfile("qwen", max_long_edge=2048, max_pixels=1280 * 28 * 28, image_format="WEBP"),
+    # 未知供应商（含 ollama 等本地模型）按 OpenAI 的尺寸、JPEG 格式处理，兼容性最好
+    "default": VisionProfile("default", max_long_edge=2048, max_short_edge=768),
+}
+
+# (关键字, profile)：依次匹配模型名与 base_url
+_PROFILE_KEYWORDS = (
+    ("claude", "claude"), ("anthropic", "claude"),
+    ("gemini", "gemini"), ("googleapis", "gemini"),
+    ("qwen", "qwen"), ("dashscope", "qwen"),
+    ("gpt", "openai"), ("api.openai.com", "openai"),
+)
+
+
+def resolve_vision_profile(model_name: Optional[str] = None, base_url: Optional[str] = None) -> VisionProfile:
+    """根据模型名与接口地址推断视觉分辨率配置"""
+    haystack = f"{model_name or ''} {base_url or ''}".lower()
+    for keyword, name in _PROFILE_KEYWORDS:
+        if keyword in haystack:
+            return VISION_PROFILES[name]
+    return VISION_PROFILES["default"]
+
+
+@dataclass
+class PayloadReport:
+    images: int = 0
+    original_bytes: int = 0
+    optimized_bytes: int = 0
+    sizes: List[Tuple[int, int]] = field(default_factory=list)
+
+    @property
+    def saved_bytes(self) -> int:
+        return self.original_bytes - self.optimized_bytes
+
+
+def fit_size(width: int, height: int, profile: VisionProfile, scale: float = 1.0) -> Tuple[int, int]:
+    """按 profile 的长边 / 短边 / 像素数上限计算缩放后的尺寸（只缩小不放大）"""
+    ratio = min(1.0, profile.max_long_edge / max(width, height))
+    if profile.max_short_edge:
+        ratio = min(ratio, profile.max_short_edge / min(width, height))
+    if profile.max_pixels:
+        ratio = min(ratio, (profile.max_pixels / (width * height)) ** 0.5)
+    ratio *= scale
+    return max(1, int(width * ratio)), max(1, int(height * ratio))
+
+
+def _decode_data_url(url: str) -> Optional[Image.Image]:
+    if not url.startswith("data:image/") or "," not in url:
+        return None
+    try:
+        data = base64.b64decode(url.split(",", 1)[1])
+        image = Image.open(io.BytesIO(data))
+        image.load()
+        return image.convert("RGB")
+    except (binascii.Error, OSError, ValueError) as e:
+        logger.warning(f"无法解析图片 data URL，按原样发送：{e}")
+        return None
+
+
+def _encode_data_url(image: Image.Image, image_format: str, quality: int) -> str:
+    buffer = io.BytesIO()
+    if image_format == "WEBP":
+        image.save(buffer, format="WEBP", quality=quality, method=4)
+    else:
+        image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    encoded = base64.b64encode(buffer.getbuffer()).decode("ascii")
+    return f"data:image/{image_format.lower()};base64,{encoded}"
+
+
+def optimize_image_urls(urls: List[str], profile: VisionProfile,
+                        max_bytes: int = VISION_PAYLOAD_MAX_BYTES) -> Tuple[List[str], PayloadReport]:
+    """
+    把 base64 data URL 图片缩放到模型实际使用的分辨率并重新编码（支持时用 WebP），
+    超出字节预算时先逐级降低质量、再逐步缩小尺寸。非 data URL（如 http 链接）原样保留。
+
+    :return: (优化后的 URL 列表, 统计信息)
+    """
+    report = PayloadReport(images=len(urls))
+    if not urls:
+        return [], report
+
+    image_format = profile.image_format if _WEBP_AVAILABLE else "JPEG"
+    decoded = [_decode_data_url(url) for url in urls]
+    report.original_bytes = sum(len(url) for url, image in zip(urls, decoded) if image is not None)
+    if report.original_bytes == 0:
+        return list(urls), report
+
+    scale = 1.0
+    while True:
+        resized = [
+            image.resize(fit_size(*image.size, profile, scale), Image.Resampling.LANCZOS) if image else None
+            for image in decoded
+        ]
+        for quality in QUALITY_STEPS:
+            optimized = [
+                _encode_data_url(image, image_format, quality) if image else url
+                for url, image in zip(urls, resized)
+            ]
+            total = sum(len(url) for url, image in zip(optimized, resized) if image is not None)
+            if total <= max_bytes:
+                break
+        longest = max(max(image.size) for image in resized if image)
+        if total <= max_bytes or longest * SCALE_STEP < MIN_LONG_EDGE:
+            break
+        scale *= SCALE_STEP
+
+    if total > max_bytes:
+        logger.warning(f"图片压缩到下限仍超出预算：{total} > {max_bytes} 字节")
+    report.optimized_bytes = total
+    report.sizes = [image.size for image in resized if image]
+    return optimized, report
@@ -0,0 +1,206 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+from app.utils.logger import get_logger
+from app.utils.path_helper import get_app_dir
+
+logger = get_logger(__name__)
+
+# 图片代理磁盘缓存上限（字节）与无需回源校验的新鲜期（秒）
+IMAGE_PROXY_CACHE_MAX_BYTES = int(os.getenv("IMAGE_PROXY_CACHE_MAX_BYTES", 200 * 1024 * 1024))
+IMAGE_PROXY_FRESH_TTL = int(os.getenv("IMAGE_PROXY_FRESH_TTL", 86400))
+IMAGE_PROXY_TIMEOUT = float(os.getenv("IMAGE_PROXY_TIMEOUT", 10))
+# 单张图片大小上限（字节），超出时中止下载
+IMAGE_PROXY_MAX_IMAGE_BYTES = int(os.getenv("IMAGE_PROXY_MAX_IMAGE_BYTES", 10 * 1024 * 1024))
+
+_HEADERS = {"Referer": "https://www.bilibili.com/"}
+_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+
+
+class ImageFetchError(Exception):
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass
+class CachedImage:
+    url: str
+    content_type: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: float = 0
+    digest: str = ""
+
+    @property
+    def client_etag(self) -> str:
+        """返回给浏览器的 ETag，基于内容摘要，与上游是否提供 ETag 无关"""
+        return f'"{self.digest}"'
+
+
+class ImageProxy:
+    """
+    远程图片代理：共享连接池 + 按 URL 的磁盘 LRU 缓存 + 过期后用 ETag / Last-Modified 回源校验，
+    同一 URL 的并发请求只回源一次。
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = IMAGE_PROXY_CACHE_MAX_BYTES,
+                 fresh_ttl: int = IMAGE_PROXY_FRESH_TTL):
+        self.cache_dir = Path(cache_dir or get_app_dir("image_proxy_cache"))
+        self.max_bytes = max_bytes
+        self.fresh_ttl = fresh_ttl
+        self._client: Optional[httpx.AsyncClient] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=IMAGE_PROXY_TIMEOUT, limits=_LIMITS,
+                                             headers=_HEADERS, follow_redirects=True)
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # ---------------- 磁盘缓存 ----------------
+
+    def _paths(self, key: str) -> Tuple[Path, Path]:
+        return self.cache_dir / f"{key}.bin", self.cache_dir / f"{key}.json"
+
+    def _load(self, key: str) -> Optional[Tuple[CachedImage, bytes]]:
+        data_path, meta_path = self._paths(key)
+        try:
+            meta = CachedImage(**json.loads(meta_path.read_text(encoding="utf-8")))
+            data = data_path.read_bytes()
+        except (OSError, ValueError, TypeError):
+            return None
+        # 用修改时间记录最近访问，供 LRU 淘汰
+        os.utime(data_path)
+        return meta, data
+
+    def _store(self, key: str, meta: CachedImage, data: Optional[bytes]) -> None:
+        data_path, meta_path = self._paths(key)
+        if data is not None:
+            temp_path = data_path.with_suffix(".tmp")
+            temp_path.write_bytes(data)
+            temp_path.replace(data_path)
+        temp_path = meta_path.with_suffix(".tmp")
+        temp_path.write_text(json.dumps(asdict(meta)), encoding="utf-8")
+        temp_path.replace(meta_path)
+        if data is not None:
+            self._evict()
+
+    def _evict(self) -> None:
+        entries = []
+        for p in self.cache_dir.glob("*.bin"):
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                # 其他请求正在淘汰同一文件
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            path.unlink(missing_ok=True)
+            path.with_suffix(".json").unlink(missing_ok=True)
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    # ---------------- 回源 ----------------
+
+    async def fetch(self, url: str, user_agent: str = "") -> Tuple[CachedImage, bytes]:
+        """返回 (元信息, 图片内容)；上游失败且无缓存时抛出 ImageFetchError"""
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        cached = await asyncio.to_thread(self._load, key)
+        if cached and time.time() - cached[0].fetched_at < self.fresh_ttl:
+            return cached
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._revalidate(key, url, user_agent, cached)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            # 没有其他等待者时避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _revalidate(self, key: str, url: str, user_agent: str,
+                          cached: Optional[Tuple[CachedImage, bytes]]) -> Tuple[CachedImage, bytes]:
+        headers = {"User-Agent": user_agent} if user_agent else {}
+        if cached:
+            if cached[0].etag:
+                headers["If-None-Match"] = cached[0].etag
+            if cached[0].last_modified:
+                headers["If-Modified-Since"] = cached[0].last_modified
+
+        try:
+            async with self._get_client().stream("GET", url, headers=headers) as resp:
+                if resp.status_code == 304 and cached:
+                    meta, data = cached
+                    meta.fetched_at = time.time()
+                    await asyncio.to_thread(self._store, key, meta, None)
+                    return meta, data
+
+                if resp.status_code != 200:
+                    if cached:
+                        logger.warning(f"图片回源返回 {resp.status_code}，返回过期缓存 {url}")
+                        return cached
+                    raise ImageFetchError(resp.status_code, "图片获取失败")
+
+                content_type = resp.headers.get("Content-Type", "")
+                if not content_type.lower().startswith("image/"):
+                    raise ImageFetchError(415, f"不是图片: {content_type or '未知类型'}")
+                data = await self._read_limited(resp)
+        except httpx.HTTPError as e:
+            if cached:
+                logger.warning(f"图片回源失败，返回过期缓存 {url}: {e}")
+                return cached
+            raise ImageFetchError(502, f"图片获取失败: {e}")
+
+        meta = CachedImage(
+            url=url,
+            content_type=content_type,
+            etag=resp.headers.get("ETag"),
+            last_modified=resp.headers.get("Last-Modified"),
+            fetched_at=time.time(),
+            digest=hashlib.sha256(data).hexdigest()[:32],
+        )
+        await asyncio.to_thread(self._store, key, meta, data)
+        return meta, data
+
+    @staticmethod
+    async def _read_limited(resp: httpx.Response) -> bytes:
+        """流式读取响应体，超过 IMAGE_PROXY_MAX_IMAGE_BYTES 时中止"""
+        length = resp.headers.get("Content-Length")
+        if length and length.isdigit() and int(length) > IMAGE_PROXY_MAX_IMAGE_BYTES:
+            raise ImageFetchError(413, "图片过大")
+        chunks, size = [], 0
+        async for chunk in resp.aiter_bytes():
+            size += len(chunk)
+            if size > IMAGE_PROXY_MAX_IMAGE_BYTES:
+                raise ImageFetchError(413, "图片过大")
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+image_proxy = ImageProxy()
@@ -0,0 +1,204 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional, Set, Tuple
+
+from PIL import Image
+
+from app.storage.storage_provider import get_storage
+from app.utils.artifact_writer import write_json
+from app.utils.logger import get_logger
+from app.utils.path_helper import get_app_dir
+
+logger = get_logger(__name__)
+
+# 图片存储目录与访问 URL，与截图的静态目录保持一致
+IMAGE_STORE_DIR = os.getenv("OUT_DIR", "./static/screenshots")
+IMAGE_BASE_URL = os.getenv("IMAGE_BASE_URL", "/static/screenshots")
+# 为每张图生成的缩略图宽度（WebP），供前端 srcset 按屏幕选择
+IMAGE_THUMB_WIDTHS = tuple(int(w) for w in os.getenv("IMAGE_THUMB_WIDTHS", "320,640").split(",") if w.strip())
+# 新写入但尚未登记引用的图片在此时间（秒）内不会被回收，避免误删生成中的笔记图片
+IMAGE_GC_GRACE = int(os.getenv("IMAGE_GC_GRACE", 3600))
+# 图片在共享存储中的 key 前缀，与静态目录下的相对路径一致（见 CachedStaticFiles）
+IMAGE_STORAGE_PREFIX = "screenshots"
+
+
+@dataclass
+class StoredImage:
+    digest: str
+    path: Path
+    url: str
+    width: int = 0
+    thumb_widths: Tuple[int, ...] = ()
+
+    @property
+    def display_url(self) -> str:
+        """
+        写入笔记的地址：以 URL 片段附带原图宽度与实际生成的缩略图宽度（#w=1920&thumbs=320,640），
+        片段不会发给服务端，前端据此生成 srcset，只列出真实存在的文件
+        """
+        if not self.width:
+            return self.url
+        return f"{self.url}#w={self.width}&thumbs={','.join(map(str, self.thumb_widths))}"
+
+
+class ImageStore:
+    """
+    内容寻址的图片存储：按 sha256 命名（{root}/ab/abcdef....jpg），相同内容只存一份，
+    写入时生成 WebP 缩略图（..._w320.webp）。
+
+    引用关系按笔记（task_id）记录在私有目录中，删除笔记时释放引用，
+    未被任何笔记引用的图片由 collect_garbage 回收。
+    引用只记录在本节点，而共享存储中的图片可能被其他节点的笔记引用，因此回收只删除本地文件，
+    共享存储中的图片交给存储桶的生命周期策略清理。
+    """
+
+    def __init__(self, root: Optional[str] = None, base_url: Optional[str] = None,
+                 refs_dir: Optional[str] = None, thumb_widths: Iterable[int] = IMAGE_THUMB_WIDTHS):
+        self.root = Path(root or IMAGE_STORE_DIR)
+        self.base_url = (base_url or IMAGE_BASE_URL).rstrip("/")
+        self.refs_dir = Path(refs_dir or get_app_dir("image_refs"))
+        self.thumb_widths = tuple(sorted(thumb_widths))
+        self._lock = threading.Lock()
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.root / digest[:2] / f"{digest}.jpg"
+
+    def _thumb_path(self, digest: str, width: int) -> Path:
+        return self.root / digest[:2] / f"{digest}_w{width}.webp"
+
+    def _storage_key(self, path: Path) -> str:
+        return f"{IMAGE_STORAGE_PREFIX}/{path.parent.name}/{path.name}"
+
+    def url_for(self, digest: str) -> str:
+        return f"{self.base_url}/{digest[:2]}/{digest}.jpg"
+
+    def put_file(self, path: str) -> StoredImage:
+        return self.put_bytes(Path(path).read_bytes())
+
+    def put_bytes(self, data: bytes) -> StoredImage:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        if path.exists():
+            # 刷新修改时间，让重复写入的图片重新获得回收宽限期
+            os.utime(path)
+            width, thumbs = self._describe(path, digest)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_name(f"{path.stem}.{threading.get_ident()}.tmp")
+            temp_path.write_bytes(data)
+            width, thumbs = self._make_thumbnails(temp_path, digest)
+            temp_path.replace(path)
+            self._mirror(digest)
+        return StoredImage(digest=digest, path=path, url=self.url_for(digest), width=width, thumb_widths=thumbs)
+
+    def _make_thumbnails(self, path: Path, digest: str) -> Tuple[int, Tuple[int, ...]]:
+        """生成比原图窄的各档缩略图，返回 (原图宽度, 成功生成的缩略图宽度)"""
+        written = []
+        try:
+            with Image.open(path) as image:
+                image = image.convert("RGB")
+                for width in self.thumb_widths:
+                    if width >= image.width:
+                        break
+                    height = round(image.height * width / image.width)
+                    try:
+                        image.resize((width, height), Image.Resampling.LANCZOS).save(
+                            self._thumb_path(digest, width), format="WEBP", quality=75, method=4)
+                    except OSError as e:
+                        self._thumb_path(digest, width).unlink(missing_ok=True)
+                        logger.warning(f"生成缩略图失败 ({digest}, w{width})：{e}")
+                        continue
+                    written.append(width)
+                return image.width, tuple(written)
+        except OSError as e:
+            logger.warning(f"读取图片失败，跳过缩略图 ({digest})：{e}")
+            return 0, ()
+
+    def _describe(self, path: Path, digest: str) -> Tuple[int, Tuple[int, ...]]:
+        """已存在的图片：读取原图宽度（只解析文件头）与已有的缩略图"""
+        try:
+            with Image.open(path) as image:
+                width = image.width
+        except OSError:
+            return 0, ()
+        return width, tuple(w for w in self.thumb_widths if self._thumb_path(digest, w).exists())
+
+    def _mirror(self, digest: str) -> None:
+        """把原图与缩略图同步到共享存储，供其他节点通过预签名 URL 访问"""
+        storage = get_storage()
+        if not storage.remote:
+            return
+        paths = [(self._blob_path(digest), "image/jpeg")]
+        paths += [(self._thumb_path(digest, w), "image/webp") for w in self.thumb_widths]
+        try:
+            for path, content_type in paths:
+                if path.exists():
+                    storage.mirror(path, self._storage_key(path), content_type)
+        except Exception as e:
+            logger.warning(f"同步图片到共享存储失败 ({digest})：{e}")
+
+    # ---------------- 引用计数 ----------------
+
+    def _refs_path(self, owner: str) -> Path:
+        return self.refs_dir / f"{owner}.json"
+
+    def _read_refs(self, path: Path) -> Set[str]:
+        try:
+            return set(json.loads(path.read_text(encoding="utf-8")))
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取图片引用失败 ({path.name})：{e}")
+            return set()
+
+    def add_refs(self, owner: str, digests: Iterable[str]) -> None:
+        """登记 owner（一般为 task_id）引用的图片，重复登记会合并"""
+        path = self._refs_path(owner)
+        with self._lock:
+            refs = self._read_refs(path) if path.exists() else set()
+            refs.update(digests)
+            write_json(path, sorted(refs))
+
+    def ref_counts(self) -> dict:
+        """统计每张图片被多少个 owner 引用"""
+        counts: dict = {}
+        for path in self.refs_dir.glob("*.json"):
+            for digest in self._read_refs(path):
+                counts[digest] = counts.get(digest, 0) + 1
+        return counts
+
+    def drop_refs(self, owner: str) -> None:
+        """只删除 owner 的引用记录，图片留给之后的 collect_garbage 统一回收"""
+        with self._lock:
+            self._refs_path(owner).unlink(missing_ok=True)
+
+    def release(self, owner: str) -> int:
+        """释放 owner 的全部引用并回收无人引用的图片，返回删除的文件数"""
+        self.drop_refs(owner)
+        return self.collect_garbage()
+
+    def disk_usage(self) -> int:
+        return sum(p.stat().st_size for p in self.root.glob("??/*") if p.is_file())
+
+    def collect_garbage(self, grace: int = IMAGE_GC_GRACE) -> int:
+        with self._lock:
+            live = self.ref_counts()
+            deadline = time.time() - grace
+            removed = 0
+            for blob in self.root.glob("??/*.jpg"):
+                digest = blob.stem
+                if len(digest) != 64 or digest in live or blob.stat().st_mtime > deadline:
+                    continue
+                for path in [blob, *(self._thumb_path(digest, w) for w in self.thumb_widths)]:
+                    if path.exists():
+                        path.unlink()
+                        removed += 1
+        if removed:
+            logger.info(f"图片回收：删除 {removed} 个文件")
+        return removed
+
+
+image_store = ImageStore()
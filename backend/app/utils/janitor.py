@@ -0,0 +1,299 @@
+import os
+import shutil
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from app.db.engine import session_scope
+from app.db.video_task_dao import claim_tasks_older_than, delete_task_by_id
+from app.storage.storage_provider import get_storage
+from app.utils import note_artifacts
+from app.utils.image_store import image_store
+from app.utils.logger import get_logger
+from app.utils.path_helper import get_app_dir, get_data_dir
+
+logger = get_logger(__name__)
+
+# 定期清理间隔（秒），0 表示不启动后台清理
+JANITOR_INTERVAL = int(os.getenv("JANITOR_INTERVAL", 3600))
+# 受管目录的磁盘总配额（字节），0 表示不限制；超出时按类别优先级 + 最近最少使用淘汰
+JANITOR_MAX_BYTES = int(os.getenv("JANITOR_MAX_BYTES", 0))
+# 文件最长保留时间（秒），0 表示不限制
+JANITOR_MAX_AGE = int(os.getenv("JANITOR_MAX_AGE", 0))
+# 保留转写与笔记结果，只清理媒体与缓存
+JANITOR_KEEP_TRANSCRIPTS = os.getenv("JANITOR_KEEP_TRANSCRIPTS", "true").lower() == "true"
+# 最近修改过的文件视为正在使用（生成中的任务），不会被清理
+JANITOR_GRACE = int(os.getenv("JANITOR_GRACE", 3600))
+# 每轮按保留期删除的任务记录上限
+JANITOR_BATCH = int(os.getenv("JANITOR_BATCH", 200))
+
+# 淘汰优先级：数值越小越先清理
+KIND_PRIORITY = {
+    "scratch": 0,     # 残留的临时文件、抽帧目录
+    "media": 1,       # 下载的音视频
+    "cache": 2,       # 元信息缓存、截图缓存、已完成任务的中间结果
+    "task": 3,        # 未完成 / 失败任务的状态与中间结果
+    "transcript": 4,  # 未完成任务的转写缓存（重试时可复用）
+    "note": 5,        # 最终笔记结果（含转写分段）
+    "batch": 5,       # 批量任务清单，/batch_status 依赖它列出子任务
+}
+PROTECTED_WHEN_KEEPING_TRANSCRIPTS = {"transcript", "note", "batch"}
+
+_FINAL_SUFFIXES = (note_artifacts.MARKDOWN_SUFFIX, note_artifacts.SEGMENTS_SUFFIX, note_artifacts.META_SUFFIX)
+_SCRATCH_SUFFIXES = (".tmp", ".part")
+
+
+@dataclass
+class Unit:
+    """一次清理的最小单位：单个文件，或同一任务 / 同一临时目录下需要一起删除的一组文件"""
+    kind: str
+    paths: List[Path]
+    size: int
+    last_used: float
+    task_id: Optional[str] = None
+
+
+@dataclass
+class Eviction:
+    paths: List[str]
+    kind: str
+    size: int
+    reason: str                     # age / quota
+    task_id: Optional[str] = None
+
+
+@dataclass
+class JanitorReport:
+    dry_run: bool
+    max_bytes: int
+    max_age: int
+    keep_transcripts: bool
+    total_bytes: int = 0
+    usage: Dict[str, int] = field(default_factory=dict)
+    evictions: List[Eviction] = field(default_factory=list)
+    expired_tasks: List[str] = field(default_factory=list)
+    freed_bytes: int = 0
+    errors: int = 0
+
+
+def _stat_unit(kind: str, paths: List[Path], task_id: Optional[str] = None) -> Optional[Unit]:
+    size, last_used, files = 0, 0.0, []
+    for path in paths:
+        members = [p for p in path.rglob("*") if p.is_file()] if path.is_dir() else [path]
+        for member in members:
+            try:
+                st = member.stat()
+            except OSError:
+                continue
+            size += st.st_size
+            # atime 在 noatime 挂载下不更新，取两者较大值作为最近使用时间
+            last_used = max(last_used, st.st_mtime, st.st_atime)
+        try:
+            last_used = max(last_used, path.stat().st_mtime)
+        except OSError:
+            continue
+        files.append(path)
+    if not files:
+        return None
+    return Unit(kind=kind, paths=files, size=size, last_used=last_used, task_id=task_id)
+
+
+class Janitor:
+    """
+    磁盘清理：扫描下载目录、笔记结果目录与各类缓存，按策略删除：
+      1. 保留期：超过 max_age 未使用的文件；已完成任务按数据库记录认领后整体删除（多节点不重复）
+      2. 配额：总占用超过 max_bytes 时按 KIND_PRIORITY 从低到高、同类内最近最少使用的顺序淘汰
+    keep_transcripts 为真时只清理媒体与缓存，转写与笔记结果永不删除。
+    截图由 ImageStore 按引用计数回收，本类只在删除笔记后触发一次回收。
+    """
+
+    def __init__(self, max_bytes: int = JANITOR_MAX_BYTES, max_age: int = JANITOR_MAX_AGE,
+                 keep_transcripts: bool = JANITOR_KEEP_TRANSCRIPTS, grace: int = JANITOR_GRACE,
+                 media_dir: Optional[str] = None, note_dir: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.keep_transcripts = keep_transcripts
+        self.grace = grace
+        self.media_dir = Path(media_dir or get_data_dir())
+        self.note_dir = Path(note_dir or note_artifacts.NOTE_OUTPUT_DIR)
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------------- 扫描 ----------------
+
+    def _scan_files(self, directory: Path, kind: str) -> Iterable[Unit]:
+        if not directory.is_dir():
+            return
+        for path in directory.iterdir():
+            unit_kind = "scratch" if path.name.endswith(_SCRATCH_SUFFIXES) else kind
+            unit = _stat_unit(unit_kind, [path])
+            if unit:
+                yield unit
+
+    def _scan_notes(self) -> Iterable[Unit]:
+        if not self.note_dir.is_dir():
+            return
+        groups: Dict[str, List[Path]] = {}
+        for path in self.note_dir.iterdir():
+            if path.is_file():
+                task_id = path.name.split(".", 1)[0].split("_", 1)[0]
+                groups.setdefault(task_id, []).append(path)
+
+        for task_id, paths in groups.items():
+            scratch = [p for p in paths if p.name.endswith(_SCRATCH_SUFFIXES)]
+            batch = [p for p in paths if p.name.endswith(".batch.json")]
+            transcripts = [p for p in paths if p.name.endswith("_transcript.bin")]
+            intermediates = [p for p in paths if "_" in p.name and p not in scratch and p not in transcripts]
+            rest = [p for p in paths if p not in scratch and p not in batch and p not in transcripts
+                    and p not in intermediates]
+            finished = any(p.name.endswith(_FINAL_SUFFIXES) for p in rest) or \
+                (self.note_dir / f"{task_id}{note_artifacts.LEGACY_SUFFIX}").exists()
+
+            for kind, members in (
+                ("scratch", scratch),
+                ("batch", batch),
+                # 已完成任务的中间结果（含转写缓存）已经没有用处
+                ("cache" if finished else "transcript", transcripts),
+                ("cache" if finished else "task", intermediates),
+                ("note" if finished else "task", rest),
+            ):
+                unit = _stat_unit(kind, members, task_id) if members else None
+                if unit:
+                    yield unit
+
+    def scan(self) -> List[Unit]:
+        units: List[Unit] = []
+        units += self._scan_files(self.media_dir, "media")
+        units += self._scan_notes()
+        units += self._scan_files(Path(get_app_dir("screenshot_cache")), "cache")
+        units += self._scan_files(Path(get_app_dir("meta_cache")), "cache")
+        # 每个 VideoReader 的临时目录作为一个整体
+        units += self._scan_files(Path(get_app_dir("video_scratch")), "scratch")
+        return units
+
+    # ---------------- 计划 ----------------
+
+    def _evictable(self, unit: Unit, now: float) -> bool:
+        if self.keep_transcripts and unit.kind in PROTECTED_WHEN_KEEPING_TRANSCRIPTS:
+            return False
+        return now - unit.last_used > self.grace
+
+    def plan(self, units: List[Unit], report: JanitorReport) -> List[tuple]:
+        now = time.time()
+        for unit in units:
+            report.usage[unit.kind] = report.usage.get(unit.kind, 0) + unit.size
+        report.usage["images"] = image_store.disk_usage()
+        report.total_bytes = sum(report.usage.values())
+
+        selected = []
+        remaining = []
+        for unit in units:
+            if not self._evictable(unit, now):
+                continue
+            # 已完成的笔记按数据库记录做保留期清理（见 _expire_tasks），这里只处理本地残留；
+            # 批量清单与笔记一样只在配额不足时淘汰
+            if self.max_age and now - unit.last_used > self.max_age and unit.kind not in ("note", "batch"):
+                selected.append((unit, "age"))
+            else:
+                remaining.append(unit)
+
+        total = report.total_bytes - sum(unit.size for unit, _ in selected)
+        if self.max_bytes and total > self.max_bytes:
+            remaining.sort(key=lambda u: (KIND_PRIORITY[u.kind], u.last_used))
+            for unit in remaining:
+                if total <= self.max_bytes:
+                    break
+                selected.append((unit, "quota"))
+                total -= unit.size
+            if total > self.max_bytes:
+                logger.warning(f"清理后磁盘占用仍超出配额：{total} > {self.max_bytes} 字节")
+        return selected
+
+    # ---------------- 执行 ----------------
+
+    def _delete_unit(self, unit: Unit) -> None:
+        for path in unit.paths:
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+
+    def _delete_note(self, task_id: str) -> None:
+        """彻底删除一篇笔记：结果文件（含共享存储副本）与截图引用"""
+        note_artifacts.delete_note_result(task_id)
+        image_store.drop_refs(task_id)
+
+    def _expire_tasks(self, report: JanitorReport) -> None:
+        """按保留期删除已完成的任务；通过 SKIP LOCKED 认领，多个节点同时运行时不会重复处理"""
+        if self.keep_transcripts or not self.max_age:
+            return
+        with session_scope() as db:
+            # 演练不加锁，避免锁住的行被其他节点的清理跳过
+            for row in claim_tasks_older_than(db, self.max_age, JANITOR_BATCH, lock=not report.dry_run):
+                report.expired_tasks.append(row.task_id)
+                if not report.dry_run:
+                    self._delete_note(row.task_id)
+                    db.delete(row)
+
+    def run(self, dry_run: bool = False) -> JanitorReport:
+        report = JanitorReport(dry_run=dry_run, max_bytes=self.max_bytes, max_age=self.max_age,
+                               keep_transcripts=self.keep_transcripts)
+        with self._run_lock:
+            try:
+                self._expire_tasks(report)
+            except Exception as e:
+                report.errors += 1
+                logger.error(f"按保留期清理任务失败：{e}")
+
+            storage_remote = get_storage().remote
+            notes_deleted = bool(report.expired_tasks) and not dry_run
+            for unit, reason in self.plan(self.scan(), report):
+                report.evictions.append(Eviction(paths=[str(p) for p in unit.paths], kind=unit.kind,
+                                                 size=unit.size, reason=reason, task_id=unit.task_id))
+                report.freed_bytes += unit.size
+                if dry_run:
+                    continue
+                try:
+                    self._delete_unit(unit)
+                    # 本地存储时删除笔记即删除数据；远程存储时本地文件只是缓存，需要时会重新拉取
+                    if unit.kind == "note" and not storage_remote:
+                        self._delete_note(unit.task_id)
+                        delete_task_by_id(unit.task_id)
+                        notes_deleted = True
+                except Exception as e:
+                    report.errors += 1
+                    logger.error(f"清理失败 ({unit.paths[0]})：{e}")
+
+            if notes_deleted:
+                image_store.collect_garbage()
+
+        logger.info(f"磁盘清理{'（演练）' if dry_run else ''}：占用 {report.total_bytes} 字节，"
+                    f"{'可释放' if dry_run else '释放'} {report.freed_bytes} 字节，"
+                    f"{len(report.evictions)} 项，过期任务 {len(report.expired_tasks)} 个")
+        return report
+
+    # ---------------- 后台线程 ----------------
+
+    def _loop(self, interval: int) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.run()
+            except Exception as e:
+                logger.error(f"后台磁盘清理失败：{e}")
+
+    def start(self, interval: int = JANITOR_INTERVAL) -> None:
+        if interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, args=(interval,), name="janitor", daemon=True)
+        self._thread.start()
+        logger.info(f"后台磁盘清理已启动，间隔 {interval} 秒")
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+janitor = Janitor()
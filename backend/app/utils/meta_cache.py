@@ -0,0 +1,63 @@
+import os
+import re
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Optional
+
+from app.models.audio_model import VideoMeta
+from app.utils.artifact_writer import read_json, write_json
+from app.utils.logger import get_logger
+from app.utils.path_helper import get_app_dir
+
+logger = get_logger(__name__)
+
+# 元信息缓存有效期（秒），默认一天
+META_CACHE_TTL = int(os.getenv("META_CACHE_TTL", 86400))
+
+
+class MetaCache:
+    """
+    视频元信息的磁盘缓存，按 (platform, video_id) 存储为单独的 JSON 文件，
+    超过 TTL 的条目视为失效。
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, ttl: Optional[int] = None):
+        self.cache_dir = Path(cache_dir or get_app_dir("meta_cache"))
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = META_CACHE_TTL if ttl is None else ttl
+
+    def _path(self, platform: str, video_id: str) -> Path:
+        safe_id = re.sub(r"[^\w\-]", "_", video_id)
+        return self.cache_dir / f"{platform}_{safe_id}.json"
+
+    def get(self, platform: str, video_id: Optional[str]) -> Optional[VideoMeta]:
+        if not video_id:
+            return None
+        path = self._path(platform, video_id)
+        if not path.exists():
+            return None
+        try:
+            data = read_json(path)
+            if time.time() - data.get("cached_at", 0) > self.ttl:
+                return None
+            return VideoMeta(**data["meta"])
+        except Exception as e:
+            logger.warning(f"读取元信息缓存失败 ({path})：{e}")
+            return None
+
+    def set(self, meta: VideoMeta, *aliases: str) -> None:
+        """
+        写入缓存；aliases 为额外的 video_id 键（如从链接解析出的 ID 与 yt-dlp 返回的 ID 不一致时）
+        """
+        payload = {"cached_at": time.time(), "meta": asdict(meta)}
+        for video_id in {meta.video_id, *[a for a in aliases if a]}:
+            path = self._path(meta.platform, video_id)
+            try:
+                # 缓存丢失只需重新探测，不必 fsync
+                write_json(path, payload, fsync=False)
+            except Exception as e:
+                logger.warning(f"写入元信息缓存失败 ({path})：{e}")
+
+
+meta_cache = MetaCache()
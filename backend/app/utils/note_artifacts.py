@@ -0,0 +1,168 @@
+import json
+import os
+from dataclasses import asdict
+from pathlib import Path
+from typing import Iterable, Optional
+
+from app.models.notes_model import NoteResult
+from app.models.transcriber_model import TranscriptResult, TranscriptSegment
+from app.storage.storage_provider import get_storage
+from app.utils.artifact_writer import write_json, write_text
+from app.utils.logger import get_logger
+from app.utils.transcript_store import MappedTranscript, write_transcript
+
+logger = get_logger(__name__)
+
+NOTE_OUTPUT_DIR = os.getenv("NOTE_OUTPUT_DIR", "note_results")
+
+# 笔记结果按用途拆成独立文件，状态轮询只需读取很小的 meta 文件（配置了远程存储时同步一份，见 app.storage）：
+#   {task_id}.note.md         最终 Markdown
+#   {task_id}.segments.bin    转写分段，二进制列式格式（见 transcript_store），不含 raw 原始响应
+#   {task_id}.meta.json       音频元信息与摘要
+MARKDOWN_SUFFIX = ".note.md"
+SEGMENTS_SUFFIX = ".segments.bin"
+META_SUFFIX = ".meta.json"
+# 旧版本把整个 NoteResult 写在 {task_id}.json 中
+LEGACY_SUFFIX = ".json"
+
+RESULT_FIELDS = ("markdown", "audio_meta", "transcript")
+# 同步到共享存储时的 key 前缀；meta 放在最后，读取方据此判断结果是否完整
+STORAGE_PREFIX = "note_results"
+PART_SUFFIXES = (MARKDOWN_SUFFIX, SEGMENTS_SUFFIX, META_SUFFIX)
+
+
+def _path(task_id: str, suffix: str) -> Path:
+    return Path(NOTE_OUTPUT_DIR) / f"{task_id}{suffix}"
+
+
+def _key(task_id: str, suffix: str) -> str:
+    return f"{STORAGE_PREFIX}/{task_id}{suffix}"
+
+
+def _write_parts(task_id: str, markdown: str, transcript: TranscriptResult, audio_meta: dict) -> bool:
+    """写入本地结果并同步到共享存储；同步失败时本地结果仍然有效，返回 False"""
+    write_text(_path(task_id, MARKDOWN_SUFFIX), markdown, sync_dir=False)
+    # 分段文件需要 mmap 按页读取，不压缩
+    write_transcript(_path(task_id, SEGMENTS_SUFFIX), transcript)
+    # meta 最后写入，作为结果已完整落盘的标志；此前的 rename 已随分段文件写入一并 fsync 目录
+    write_json(_path(task_id, META_SUFFIX), {
+        "audio_meta": audio_meta,
+        "transcript": {"language": transcript.language, "segment_count": len(transcript.segments)},
+        "markdown_length": len(markdown),
+    })
+    storage = get_storage()
+    try:
+        for suffix in PART_SUFFIXES:
+            storage.mirror(_path(task_id, suffix), _key(task_id, suffix))
+    except Exception as e:
+        logger.error(f"同步笔记结果到共享存储失败 (task_id={task_id})：{e}")
+        return False
+    return True
+
+
+def save_note_result(task_id: str, note: NoteResult) -> bool:
+    """保存笔记结果，返回是否已同步到共享存储（本地存储时始终为 True）"""
+    os.makedirs(NOTE_OUTPUT_DIR, exist_ok=True)
+    return _write_parts(task_id, note.markdown, note.transcript, asdict(note.audio_meta))
+
+
+def _migrate_legacy(task_id: str) -> bool:
+    """把旧版 {task_id}.json 拆分为新格式，成功后删除旧文件"""
+    legacy_path = _path(task_id, LEGACY_SUFFIX)
+    if not legacy_path.exists():
+        return False
+    try:
+        data = json.loads(legacy_path.read_text(encoding="utf-8"))
+        transcript = data.get("transcript") or {}
+        _write_parts(task_id, data.get("markdown") or "", TranscriptResult(
+            language=transcript.get("language"),
+            full_text=transcript.get("full_text") or "",
+            segments=[TranscriptSegment(**seg) for seg in transcript.get("segments") or []],
+        ), data.get("audio_meta") or {})
+    except (OSError, ValueError, TypeError) as e:
+        logger.error(f"迁移旧版笔记结果失败 (task_id={task_id})：{e}")
+        return False
+    legacy_path.unlink(missing_ok=True)
+    logger.info(f"已迁移旧版笔记结果 (task_id={task_id})")
+    return True
+
+
+def _fetch_remote(task_id: str) -> bool:
+    """本地没有结果时从共享存储拉取（其他节点生成的笔记），本地目录即读穿缓存"""
+    storage = get_storage()
+    if not storage.remote:
+        return False
+    os.makedirs(NOTE_OUTPUT_DIR, exist_ok=True)
+    try:
+        return all(storage.ensure_local(_key(task_id, suffix), _path(task_id, suffix)) for suffix in PART_SUFFIXES)
+    except Exception as e:
+        logger.error(f"从共享存储拉取笔记结果失败 (task_id={task_id})：{e}")
+        return False
+
+
+def has_note_result(task_id: str) -> bool:
+    return _path(task_id, META_SUFFIX).exists() or _migrate_legacy(task_id) or _fetch_remote(task_id)
+
+
+def delete_note_result(task_id: str) -> int:
+    """删除任务的全部本地文件（结果、状态与中间缓存）及共享存储中的副本，返回删除的本地文件数"""
+    removed = 0
+    for path in Path(NOTE_OUTPUT_DIR).glob(f"{task_id}[._]*"):
+        path.unlink(missing_ok=True)
+        removed += 1
+    storage = get_storage()
+    for suffix in PART_SUFFIXES:
+        storage.remove(_key(task_id, suffix))
+    return removed
+
+
+def load_summary(task_id: str) -> Optional[dict]:
+    """读取结果摘要（音频元信息、分段数、Markdown 长度），体积与转写长度无关"""
+    if not has_note_result(task_id):
+        return None
+    return json.loads(_path(task_id, META_SUFFIX).read_text(encoding="utf-8"))
+
+
+def load_markdown(task_id: str) -> Optional[str]:
+    if not has_note_result(task_id):
+        return None
+    return _path(task_id, MARKDOWN_SUFFIX).read_text(encoding="utf-8")
+
+
+def load_transcript_page(task_id: str, offset: int = 0, limit: int = 500,
+                         start: Optional[float] = None, end: Optional[float] = None) -> Optional[dict]:
+    """
+    分页读取转写分段；传入 start / end（秒）时只在与该时间段重叠的分段内分页。
+    文件通过 mmap 访问，只解码返回的分段。
+    """
+    if not has_note_result(task_id):
+        return None
+    with MappedTranscript(_path(task_id, SEGMENTS_SUFFIX)) as transcript:
+        indices = range(len(transcript))
+        if start is not None or end is not None:
+            indices = transcript.range_for(start if start is not None else float("-inf"),
+                                           end if end is not None else float("inf"))
+        page = indices[offset:offset + limit]
+        return {
+            "language": transcript.language,
+            "total": len(indices),
+            "offset": offset,
+            "limit": limit,
+            "segments": [asdict(seg) for seg in transcript.iter_segments(page)],
+        }
+
+
+def load_note_result(task_id: str, fields: Iterable[str] = RESULT_FIELDS) -> Optional[dict]:
+    """
+    按需读取结果字段：markdown / audio_meta / transcript（transcript 为摘要，分段请用 load_transcript_page）
+    """
+    summary = load_summary(task_id)
+    if summary is None:
+        return None
+    result = {}
+    for field in fields:
+        if field == "markdown":
+            result["markdown"] = load_markdown(task_id)
+        elif field in ("audio_meta", "transcript"):
+            result[field] = summary.get(field)
+    return result
@@ -0,0 +1,39 @@
+import os
+import re
+
+from starlette.exceptions import HTTPException
+from starlette.responses import RedirectResponse
+from starlette.staticfiles import StaticFiles
+
+from app.storage.storage_provider import S3_PRESIGN_EXPIRES, get_storage
+
+# 内容寻址图片（sha256 文件名及其缩略图）内容永不变化，可长期缓存
+IMMUTABLE_FILE_PATTERN = re.compile(r"^[0-9a-f]{64}(?:_w\d+)?\.(?:jpg|webp)$")
+
+
+class CachedStaticFiles(StaticFiles):
+    """
+    为内容寻址的文件加上 `Cache-Control: immutable`，其余文件保持默认的 ETag / Last-Modified 协商缓存。
+    配置了远程存储时，本地缺失的内容寻址图片（其他节点生成的截图）重定向到预签名 URL。
+    """
+
+    async def get_response(self, path, scope):
+        try:
+            return await super().get_response(path, scope)
+        except HTTPException as e:
+            storage = get_storage()
+            if e.status_code != 404 or not storage.remote or not IMMUTABLE_FILE_PATTERN.match(os.path.basename(path)):
+                raise
+            url = storage.url(path.replace(os.sep, "/"))
+            if not url:
+                raise
+            response = RedirectResponse(url, status_code=307)
+            # 预签名 URL 过期前浏览器可以直接复用重定向结果
+            response.headers["Cache-Control"] = f"private, max-age={S3_PRESIGN_EXPIRES // 2}"
+            return response
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if IMMUTABLE_FILE_PATTERN.match(os.path.basename(full_path)):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
@@ -0,0 +1,183 @@
+"""
+转写结果的紧凑二进制格式（.bin），按列存储，读取时 mmap 映射，按需解码。
+
+文件布局（小端序）：
+    header      "<4sBxxxIIIH2x"：magic "BNTR"、版本、分段数 n、分段文本字节数、full_text 字节数、语言字节数
+    language    UTF-8，补齐到 4 字节对齐
+    starts      float32[n]
+    ends        float32[n]
+    offsets     uint32[n + 1]   第 i 段文本位于 text[offsets[i]:offsets[i + 1]]
+    text        UTF-8，各段文本首尾相接
+    full_text   UTF-8
+
+整个文件可以是 zstd 压缩的（见 artifact_writer），读取时自动解压到内存，不再 mmap。
+"""
+import bisect
+import mmap
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Union
+
+from app.models.transcriber_model import TranscriptResult, TranscriptSegment, TranscriptSegments
+from app.utils.artifact_writer import ZSTD_MAGIC, atomic_open, compressed, compression_enabled, read_bytes
+
+MAGIC = b"BNTR"
+VERSION = 1
+_HEADER = struct.Struct("<4sBxxxIIIH2x")
+_LITTLE_ENDIAN = sys.byteorder == "little"
+
+
+def _pad4(size: int) -> int:
+    return (size + 3) & ~3
+
+
+def _column(typecode: str, values) -> bytes:
+    column = array(typecode, values)
+    if not _LITTLE_ENDIAN:
+        column.byteswap()
+    return column.tobytes()
+
+
+def write_transcript(path: Union[str, Path], transcript: TranscriptResult, compress: bool = False) -> None:
+    """
+    把 TranscriptResult 写为二进制格式（原子写入）。
+    compress=True 时大文件用 zstd 压缩；需要按页 mmap 读取的文件不要压缩。
+    """
+    segments = TranscriptSegments.from_segments(transcript.segments)
+    encoded = [text.encode("utf-8") for text in segments.texts]
+    offsets = [0]
+    for text in encoded:
+        offsets.append(offsets[-1] + len(text))
+    language = (transcript.language or "").encode("utf-8")
+    full_text = (transcript.full_text or "").encode("utf-8")
+
+    size = _HEADER.size + _pad4(len(language)) + 12 * len(segments) + 4 + offsets[-1] + len(full_text)
+    with atomic_open(path) as f, compressed(f, compress and compression_enabled(size)) as out:
+        out.write(_HEADER.pack(MAGIC, VERSION, len(segments), offsets[-1], len(full_text), len(language)))
+        out.write(language.ljust(_pad4(len(language)), b"\0"))
+        out.write(_column("f", segments.starts))
+        out.write(_column("f", segments.ends))
+        out.write(_column("I", offsets))
+        for text in encoded:
+            out.write(text)
+        out.write(full_text)
+
+
+class MappedTranscript:
+    """
+    mmap 打开的二进制转写（压缩文件则解压到内存）：按时间二分查找分段、按时间段切片，只解码实际访问的文本。
+    用完需 close()，或作为上下文管理器使用。
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        with open(path, "rb") as f:
+            if f.read(len(ZSTD_MAGIC)) == ZSTD_MAGIC:
+                self._mmap = None
+                self._buffer = read_bytes(path)
+            else:
+                self._mmap = self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, count, text_size, full_size, lang_size = _HEADER.unpack_from(self._buffer, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"不是有效的转写文件：{path}")
+            view = self._view = memoryview(self._buffer)
+            pos = _HEADER.size
+            self.language = bytes(view[pos:pos + lang_size]).decode("utf-8") or None
+            pos += _pad4(lang_size)
+            self._starts = self._cast(view[pos:pos + 4 * count], "f")
+            pos += 4 * count
+            self._ends = self._cast(view[pos:pos + 4 * count], "f")
+            pos += 4 * count
+            self._offsets = self._cast(view[pos:pos + 4 * (count + 1)], "I")
+            pos += 4 * (count + 1)
+            self._text_pos = pos
+            self._full_text_range = (pos + text_size, pos + text_size + full_size)
+            self._count = count
+        except Exception:
+            self.close()
+            raise
+
+    @staticmethod
+    def _cast(view: memoryview, typecode: str) -> Sequence:
+        if _LITTLE_ENDIAN:
+            return view.cast(typecode)
+        column = array(typecode, view.tobytes())
+        column.byteswap()
+        return column
+
+    def close(self) -> None:
+        # 释放 memoryview 后才能关闭 mmap
+        for name in ("_starts", "_ends", "_offsets", "_view"):
+            column = getattr(self, name, None)
+            if isinstance(column, memoryview):
+                column.release()
+        if self._mmap is not None:
+            self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def start(self, index: int) -> float:
+        return self._starts[index]
+
+    def end(self, index: int) -> float:
+        return self._ends[index]
+
+    def text(self, index: int) -> str:
+        begin = self._text_pos + self._offsets[index]
+        finish = self._text_pos + self._offsets[index + 1]
+        return self._buffer[begin:finish].decode("utf-8")
+
+    @property
+    def full_text(self) -> str:
+        begin, finish = self._full_text_range
+        return self._buffer[begin:finish].decode("utf-8")
+
+    def segment(self, index: int) -> TranscriptSegment:
+        # float32 只有约 7 位有效数字，保留到毫秒避免输出 0.10000000149 之类的值
+        return TranscriptSegment(start=round(self._starts[index], 3), end=round(self._ends[index], 3),
+                                 text=self.text(index))
+
+    def index_at(self, timestamp: float) -> Optional[int]:
+        """返回 timestamp 所在（或之前最近）分段的下标，O(log n)"""
+        index = bisect.bisect_right(self._starts, timestamp) - 1
+        return index if index >= 0 else None
+
+    def range_for(self, start: float, end: float) -> range:
+        """与时间段 [start, end) 有重叠的分段下标范围（分段按时间先后排列且互不重叠）"""
+        first = bisect.bisect_right(self._ends, start)
+        last = bisect.bisect_left(self._starts, end)
+        return range(first, max(first, last))
+
+    def iter_segments(self, indices: Optional[range] = None) -> Iterator[TranscriptSegment]:
+        """按需逐个转换为 TranscriptSegment"""
+        for index in indices if indices is not None else range(self._count):
+            yield self.segment(index)
+
+    def slice_time(self, start: float, end: float) -> List[TranscriptSegment]:
+        return list(self.iter_segments(self.range_for(start, end)))
+
+    def to_segments(self) -> TranscriptSegments:
+        """整体读出为 TranscriptSegments（列直接转为数组，不逐段创建对象）"""
+        texts = [self.text(i) for i in range(self._count)]
+        starts = array("d", (round(v, 3) for v in self._starts))
+        ends = array("d", (round(v, 3) for v in self._ends))
+        return TranscriptSegments(starts, ends, texts)
+
+    def to_result(self) -> TranscriptResult:
+        return TranscriptResult(language=self.language, full_text=self.full_text, segments=self.to_segments())
+
+
+def read_transcript(path: Union[str, Path]) -> TranscriptResult:
+    """一次性读出完整 TranscriptResult（兼容原有调用方）"""
+    with MappedTranscript(path) as transcript:
+        return transcript.to_result()
+
@@ -1,23 +1,123 @@
+import os
 import re
+import threading
+from collections import OrderedDict
 from typing import Optional
-import requests
+from urllib.parse import urlparse
 
+import httpx
 
-def extract_video_id(url: str, platform: str) -> Optional[str]:
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 短链解析超时（秒）与缓存条数
+SHORT_URL_TIMEOUT = float(os.getenv("SHORT_URL_TIMEOUT", 5))
+SHORT_URL_CACHE_SIZE = int(os.getenv("SHORT_URL_CACHE_SIZE", 1024))
+
+# 需要跟随重定向才能拿到视频 ID 的短链域名
+SHORT_URL_HOSTS = {
+    "bilibili": ("b23.tv",),
+    "douyin": ("v.douyin.com",),
+}
+
+_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36",
+}
+_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+
+# 共享连接池：同步客户端供下载器线程使用，异步客户端供请求处理函数使用（首次使用时创建，绑定当前事件循环）
+_sync_client = httpx.Client(follow_redirects=True, timeout=SHORT_URL_TIMEOUT, limits=_LIMITS, headers=_HEADERS)
+_async_client: Optional[httpx.AsyncClient] = None
+
+# 短链 -> 真实链接 的 LRU 缓存
+_resolved_urls: "OrderedDict[str, str]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cache_get(url: str) -> Optional[str]:
+    with _cache_lock:
+        resolved = _resolved_urls.get(url)
+        if resolved is not None:
+            _resolved_urls.move_to_end(url)
+        return resolved
+
+
+def _cache_put(url: str, resolved: str) -> None:
+    with _cache_lock:
+        _resolved_urls[url] = resolved
+        _resolved_urls.move_to_end(url)
+        while len(_resolved_urls) > SHORT_URL_CACHE_SIZE:
+            _resolved_urls.popitem(last=False)
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(follow_redirects=True, timeout=SHORT_URL_TIMEOUT,
+                                          limits=_LIMITS, headers=_HEADERS)
+    return _async_client
+
+
+async def close_http_clients() -> None:
+    """应用关闭时释放连接池"""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+    _sync_client.close()
+
+
+def find_url(text: str) -> Optional[str]:
+    """从分享文案中找出第一个链接"""
+    match = re.search(r"https?://[^\s一-龥]+", text)
+    return match.group(0) if match else None
+
+
+def is_short_url(url: str, platform: str) -> bool:
+    host = urlparse(url).netloc.lower()
+    return host in SHORT_URL_HOSTS.get(platform, ())
+
+
+def resolve_short_url(short_url: str) -> Optional[str]:
     """
-    从视频链接中提取视频 ID
+    跟随重定向解析短链（同步版本），使用共享连接池、超时控制与 LRU 缓存
 
-    :param url: 视频链接
-    :param platform: 平台名（bilibili / youtube / douyin）
-    :return: 提取到的视频 ID 或 None
+    :param short_url: 短链接（如"https://b23.tv/xxxxxx"）
+    :return: 真实链接或None
     """
-    if platform == "bilibili":
-        # 如果是短链接，则解析真实链接
-        if "b23.tv" in url:
-            resolved_url = resolve_bilibili_short_url(url)
-            if resolved_url:
-                url = resolved_url
+    cached = _cache_get(short_url)
+    if cached:
+        return cached
+    try:
+        response = _sync_client.head(short_url)
+        resolved = str(response.url)
+    except httpx.HTTPError as e:
+        logger.warning(f"解析短链失败 {short_url}: {e}")
+        return None
+    _cache_put(short_url, resolved)
+    return resolved
+
+
+async def resolve_short_url_async(short_url: str) -> Optional[str]:
+    """
+    跟随重定向解析短链（异步版本），不阻塞事件循环
+    """
+    cached = _cache_get(short_url)
+    if cached:
+        return cached
+    try:
+        response = await _get_async_client().head(short_url)
+        resolved = str(response.url)
+    except httpx.HTTPError as e:
+        logger.warning(f"解析短链失败 {short_url}: {e}")
+        return None
+    _cache_put(short_url, resolved)
+    return resolved
 
+
+def _match_video_id(url: str, platform: str) -> Optional[str]:
+    if platform == "bilibili":
         # 匹配 BV号（如 BV1vc411b7Wa）
         match = re.search(r"BV([0-9A-Za-z]+)", url)
         return f"BV{match.group(1)}" if match else None
@@ -29,12 +129,42 @@ def extract_video_id(url: str, platform: str) -> Optional[str]:
 
     elif platform == "douyin":
         # 匹配 douyin.com/video/1234567890123456789
-        match = re.search(r"/video/(\d+)", url)
+        match = re.search(r"/video/(\d+)", url) or re.search(r"aweme_id=(\d+)", url)
         return match.group(1) if match else None
 
     return None
 
 
+def _short_url_in(url: str, platform: str) -> Optional[str]:
+    if platform not in SHORT_URL_HOSTS:
+        return None
+    candidate = find_url(url) or url
+    return candidate if is_short_url(candidate, platform) else None
+
+
+def extract_video_id(url: str, platform: str) -> Optional[str]:
+    """
+    从视频链接中提取视频 ID
+
+    :param url: 视频链接
+    :param platform: 平台名（bilibili / youtube / douyin）
+    :return: 提取到的视频 ID 或 None
+    """
+    # 如果是短链接，则解析真实链接
+    short_url = _short_url_in(url, platform)
+    if short_url:
+        url = resolve_short_url(short_url) or url
+    return _match_video_id(url, platform)
+
+
+async def extract_video_id_async(url: str, platform: str) -> Optional[str]:
+    """extract_video_id 的异步版本，供请求处理函数使用"""
+    short_url = _short_url_in(url, platform)
+    if short_url:
+        url = await resolve_short_url_async(short_url) or url
+    return _match_video_id(url, platform)
+
+
 def resolve_bilibili_short_url(short_url: str) -> Optional[str]:
     """
     解析哔哩哔哩短链接以获取真实视频链接
@@ -42,9 +172,4 @@ def resolve_bilibili_short_url(short_url: str) -> Optional[str]:
     :param short_url: Bilibili短链接（如"https://b23.tv/xxxxxx"）
     :return: 真实的视频链接或None
     """
-    try:
-        response = requests.head(short_url, allow_redirects=True)
-        return response.url
-    except requests.RequestException as e:
-        print(f"Error resolving short URL: {e}")
-        return None
+    return resolve_short_url(short_url)
@@ -1,17 +1,38 @@
+import hashlib
+import io
+import re
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import httpx
 from dotenv import load_dotenv
+from PIL import Image
 import subprocess
 import os
 import uuid
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
 load_dotenv()
 api_path = os.getenv("API_BASE_URL", "http://localhost")
 BACKEND_PORT= os.getenv("BACKEND_PORT", 8483)
 
 BACKEND_BASE_URL = f"{api_path}:{BACKEND_PORT}"
+# 并行截图的 ffmpeg 进程数上限
+SCREENSHOT_WORKERS = int(os.getenv("SCREENSHOT_WORKERS", 4))
+# 本地缓存封面的最大宽度
+COVER_MAX_WIDTH = int(os.getenv("COVER_MAX_WIDTH", 640))
+# 拉取封面时按平台携带的 Referer（有防盗链的平台），其余平台不携带
+COVER_REFERERS = {
+    "bilibili": "https://www.bilibili.com/",
+    "douyin": "https://www.douyin.com/",
+    "tiktok": "https://www.douyin.com/",
+    "kuaishou": "https://www.kuaishou.com/",
+}
 
-from typing import Optional
+from typing import Callable, Dict, Iterable, Optional
 def generate_screenshot(video_path: str, output_dir: str, timestamp: int, index: int) -> str:
     """
     使用 ffmpeg 生成截图，返回生成图片路径
@@ -41,6 +62,84 @@ def generate_screenshot(video_path: str, output_dir: str, timestamp: int, index:
     return str(output_path)
 
 
+def _screenshot_path(output_dir: Path, cache_key: str, timestamp: int) -> Path:
+    safe_key = re.sub(r"[^0-9A-Za-z_-]", "_", cache_key)
+    return output_dir / f"screenshot_{safe_key}_{timestamp:06d}.jpg"
+
+
+def _extract_screenshot(video_path: str, output_path: Path, timestamp: int) -> Optional[str]:
+    """截取单帧到 output_path，先写临时文件再改名，避免失败时留下残缺的缓存文件"""
+    temp_path = output_path.with_name(f"{output_path.stem}.part{output_path.suffix}")
+    command = [
+        "ffmpeg",
+        "-ss", str(timestamp),
+        "-i", str(video_path),
+        "-frames:v", "1",
+        "-q:v", "2",
+        str(temp_path),
+        "-y"
+    ]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0 or not temp_path.exists():
+        logger.warning(f"ffmpeg 截图失败 (timestamp={timestamp})：{result.stderr}")
+        temp_path.unlink(missing_ok=True)
+        return None
+    temp_path.replace(output_path)
+    return str(output_path)
+
+
+def _write_screenshot(output_path: Path, data: bytes) -> str:
+    temp_path = output_path.with_name(f"{output_path.stem}.part{output_path.suffix}")
+    temp_path.write_bytes(data)
+    temp_path.replace(output_path)
+    return str(output_path)
+
+
+def generate_screenshots(video_path: str, output_dir: str, timestamps: Iterable[int],
+                         cache_key: str, max_workers: int = SCREENSHOT_WORKERS,
+                         frame_source: Optional[Callable[[int], Optional[bytes]]] = None) -> Dict[int, str]:
+    """
+    批量生成截图：时间戳去重后并行调用 ffmpeg，返回 {时间戳: 图片路径}。
+    图片按 (cache_key, 时间戳) 命名，已存在的直接复用；截取失败的时间戳不会出现在结果中。
+
+    :param cache_key: 缓存键，一般为 "平台_视频ID"
+    :param frame_source: 可选，按时间戳返回已解码好的 JPEG 数据（如视频理解阶段的帧），命中时不再调用 ffmpeg
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    results: Dict[int, str] = {}
+    pending = []
+    for ts in sorted(set(timestamps)):
+        path = _screenshot_path(output_dir, cache_key, ts)
+        if path.exists() and path.stat().st_size > 0:
+            results[ts] = str(path)
+            continue
+        frame = frame_source(ts) if frame_source else None
+        if frame:
+            results[ts] = _write_screenshot(path, frame)
+        else:
+            pending.append((ts, path))
+
+    if pending:
+        logger.info(f"ffmpeg 截图 {len(pending)} 张，其余 {len(results)} 张来自缓存或已有帧")
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pending)))) as pool:
+            extracted = pool.map(lambda item: _extract_screenshot(video_path, item[1], item[0]), pending)
+            for (ts, _), path in zip(pending, extracted):
+                if path:
+                    results[ts] = path
+    return results
+
+
+def clear_screenshot_cache(output_dir: str, cache_key: str) -> int:
+    """删除某个视频的截图缓存，返回删除的文件数"""
+    pattern = _screenshot_path(Path(output_dir), cache_key, 0).name.replace("000000", "*")
+    removed = 0
+    for path in Path(output_dir).glob(pattern):
+        path.unlink(missing_ok=True)
+        removed += 1
+    return removed
+
 
 def save_cover_to_static(local_cover_path: str, subfolder: Optional[str] = "cover") -> str:
     """
@@ -67,3 +166,45 @@ def save_cover_to_static(local_cover_path: str, subfolder: Optional[str] = "cove
     url_path = f"{BACKEND_BASE_URL.rstrip('/')}/{image_relative_path.lstrip('/')}"
     # 返回前端可访问的路径
     return url_path
+
+
+def is_static_url(url: Optional[str]) -> bool:
+    """是否已经是本服务 static 目录下的地址"""
+    return bool(url) and "/static/" in url
+
+
+def cache_remote_cover(cover_url: str, platform: Optional[str] = None, subfolder: str = "cover",
+                       max_width: int = COVER_MAX_WIDTH) -> Optional[str]:
+    """
+    下载远程封面，缩放到 max_width 以内后存入 static 目录，返回前端可访问的路径；失败时返回 None。
+    文件名取自 URL 摘要，同一封面只下载一次。
+
+    :param platform: 视频所属平台，决定请求携带的 Referer
+    """
+    if not cover_url or is_static_url(cover_url):
+        return cover_url or None
+
+    target_dir = os.path.join(os.getcwd(), "static", subfolder)
+    file_name = f"{hashlib.sha1(cover_url.encode('utf-8')).hexdigest()[:20]}.jpg"
+    target_path = os.path.join(target_dir, file_name)
+    url_path = f"{BACKEND_BASE_URL.rstrip('/')}/static/{subfolder}/{file_name}"
+    if os.path.exists(target_path):
+        return url_path
+
+    try:
+        referer = COVER_REFERERS.get(platform or "")
+        resp = httpx.get(cover_url, headers={"Referer": referer} if referer else None,
+                         timeout=10, follow_redirects=True)
+        resp.raise_for_status()
+        image = Image.open(io.BytesIO(resp.content)).convert("RGB")
+        if image.width > max_width:
+            image = image.resize((max_width, round(image.height * max_width / image.width)),
+                                 Image.Resampling.LANCZOS)
+        os.makedirs(target_dir, exist_ok=True)
+        temp_path = f"{target_path}.part"
+        image.save(temp_path, format="JPEG", quality=85)
+        os.replace(temp_path, target_path)
+    except (httpx.HTTPError, OSError) as e:
+        logger.warning(f"封面缓存失败 {cover_url}: {e}")
+        return None
+    return url_path
@@ -1,7 +1,14 @@
 import base64
+import bisect
+import io
 import os
 import re
+import shutil
 import subprocess
+import tempfile
+import weakref
+from typing import Iterable, Iterator, Optional
+
 import ffmpeg
 from PIL import Image, ImageDraw, ImageFont
 
@@ -9,6 +16,71 @@ from app.utils.logger import get_logger
 from app.utils.path_helper import get_app_dir
 
 logger = get_logger(__name__)
+
+
+class FrameIndex:
+    """
+    视频理解阶段采样到的帧，供后续插入截图时直接复用，省去再次调用 ffmpeg。
+    内存中只保存时间戳，帧编码为 JPEG 后写入独立的临时目录，用完调用 cleanup() 删除。
+
+    取距离时间戳最近、且不超过 tolerance 秒的帧；
+    scene 采样下画面在两次变化之间保持不变，时间戳之前最后一张保留帧到时间戳之间没有被 max_grids 淘汰的场景切换时，
+    即使超出 tolerance 也可以复用。
+    """
+
+    def __init__(self, sampling: str = "fixed", quality: int = 90):
+        self.sampling = sampling
+        self.quality = quality
+        self._timestamps: list[int] = []
+        # scene 采样中因 max_grids 被丢弃的场景切换点，这些位置前后画面已经不同
+        self._cuts: list[int] = []
+        self._dir = tempfile.mkdtemp(prefix="frame_index_", dir=get_app_dir("video_scratch"))
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self._dir, True)
+
+    def __len__(self) -> int:
+        return len(self._timestamps)
+
+    def _path(self, ts: int) -> str:
+        return os.path.join(self._dir, f"{ts:06d}.jpg")
+
+    def add(self, ts: int, frame: Image.Image) -> None:
+        # 帧按时间顺序到达，直接追加即可保持有序
+        frame.save(self._path(ts), format="JPEG", quality=self.quality)
+        self._timestamps.append(ts)
+
+    def mark_cuts(self, timestamps: Iterable[int]) -> None:
+        self._cuts = sorted(timestamps)
+
+    def _stable(self, start: int, ts: int) -> bool:
+        """(start, ts] 之间没有被丢弃的场景切换"""
+        return bisect.bisect_right(self._cuts, ts) == bisect.bisect_right(self._cuts, start)
+
+    def lookup(self, ts: int, tolerance: float) -> Optional[bytes]:
+        """返回可代替 ts 处截图的帧，没有合适的帧时返回 None"""
+        pos = bisect.bisect_right(self._timestamps, ts)
+        if self.sampling == "scene":
+            if not pos:
+                return None
+            prev = self._timestamps[pos - 1]
+            if ts - prev > tolerance and not self._stable(prev, ts):
+                return None
+            best = prev
+        else:
+            candidates = [self._timestamps[i] for i in (pos - 1, pos) if 0 <= i < len(self._timestamps)]
+            candidates = [t for t in candidates if abs(t - ts) <= tolerance]
+            if not candidates:
+                return None
+            best = min(candidates, key=lambda t: abs(t - ts))
+        try:
+            with open(self._path(best), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def cleanup(self) -> None:
+        self._finalizer()
+
+
 class VideoReader:
     def __init__(self,
                  video_path: str,
@@ -19,17 +91,64 @@ class VideoReader:
                  save_quality=90,
                  font_path="fonts/arial.ttf",
                  frame_dir=None,
-                 grid_dir=None):
+                 grid_dir=None,
+                 keyframes_only=False,
+                 sampling="fixed",
+                 scene_threshold=10,
+                 max_grids=None,
+                 index_frames=False):
         self.video_path = video_path
         self.grid_size = grid_size
         self.frame_interval = frame_interval
         self.unit_width = unit_width
         self.unit_height = unit_height
         self.save_quality = save_quality
-        self.frame_dir = frame_dir or get_app_dir("output_frames")
-        self.grid_dir = grid_dir or get_app_dir("grid_output")
-        print(f"视频路径：{video_path}",self.frame_dir,self.grid_dir)
+        # 未指定目录时，每个实例在首次落盘时创建独立的临时目录，并发任务互不干扰
+        self._frame_dir = frame_dir
+        self._grid_dir = grid_dir
+        self._scratch_dir = None
+        self._finalizer = None
+        print(f"视频路径：{video_path}")
         self.font_path = font_path
+        # 仅解码关键帧：长视频抽帧更快，但帧时间会对齐到最近的关键帧
+        self.keyframes_only = keyframes_only
+        # 采样方式：fixed 按固定间隔取帧；scene 仅在画面变化（感知哈希差异 >= scene_threshold 位）时取帧
+        self.sampling = sampling
+        self.scene_threshold = scene_threshold
+        # scene 采样时的网格图数量上限，超出时丢弃与前一帧最相似的帧
+        self.max_grids = max_grids
+        # run() 过程中采样到的帧，截图时可直接复用；只在需要插入截图时记录
+        self.frame_index = FrameIndex(sampling=sampling, quality=save_quality) if index_frames else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.cleanup()
+
+    def _scratch(self, name: str) -> str:
+        if self._scratch_dir is None:
+            self._scratch_dir = tempfile.mkdtemp(prefix="video_reader_", dir=get_app_dir("video_scratch"))
+            # 忘记调用 cleanup() 时，实例被回收或进程退出时兜底删除
+            self._finalizer = weakref.finalize(self, shutil.rmtree, self._scratch_dir, True)
+        path = os.path.join(self._scratch_dir, name)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    @property
+    def frame_dir(self) -> str:
+        return self._frame_dir or self._scratch("frames")
+
+    @property
+    def grid_dir(self) -> str:
+        return self._grid_dir or self._scratch("grids")
+
+    def cleanup(self) -> None:
+        """删除本实例的临时目录（调用方显式传入的 frame_dir / grid_dir 不会被删除）"""
+        if self._finalizer is not None:
+            self._finalizer()
+            self._finalizer = None
+            self._scratch_dir = None
 
     def format_time(self, seconds: float) -> str:
         mm = int(seconds // 60)
@@ -37,32 +156,89 @@ class VideoReader:
         return f"{mm:02d}_{ss:02d}"
 
     def extract_time_from_filename(self, filename: str) -> float:
-        match = re.search(r"frame_(\d{2})_(\d{2})\.jpg", filename)
+        match = re.search(r"frame_(\d{2,})_(\d{2})\.jpg", filename)
         if match:
             mm, ss = map(int, match.groups())
             return mm * 60 + ss
         return float('inf')
 
-    def extract_frames(self, max_frames=1000) -> list[str]:
+    @property
+    def interval(self) -> int:
+        # video_interval 未设置（0）时回退到默认的 2 秒
+        return self.frame_interval if self.frame_interval and self.frame_interval > 0 else 2
+
+    def _frame_count(self, max_frames: int) -> int:
+        duration = float(ffmpeg.probe(self.video_path)["format"]["duration"])
+        return min(len(range(0, int(duration), self.interval)), max_frames)
 
+    def _ffmpeg_input(self) -> list[str]:
+        cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error"]
+        if self.keyframes_only:
+            cmd += ["-skip_frame", "nokey"]
+        return cmd + ["-i", self.video_path, "-an", "-sn", "-dn"]
+
+    def extract_frames(self, max_frames=1000) -> list[str]:
+        """
+        单次 ffmpeg 调用，用 fps 滤镜按 frame_interval 输出所有帧，避免每帧重新打开、定位一次视频
+        """
         try:
             os.makedirs(self.frame_dir, exist_ok=True)
-            duration = float(ffmpeg.probe(self.video_path)["format"]["duration"])
-            timestamps = [i for i in range(0, int(duration), self.frame_interval)][:max_frames]
+            count = self._frame_count(max_frames)
+            if count == 0:
+                return []
+
+            pattern = os.path.join(self.frame_dir, "raw_%06d.jpg")
+            cmd = self._ffmpeg_input() + ["-vf", f"fps=1/{self.interval}", "-frames:v", str(count),
+                                          "-q:v", "2", "-y", pattern]
+            subprocess.run(cmd, check=True)
 
+            # fps 滤镜输出的第 n 帧对应时间 n * interval，重命名为 frame_mm_ss.jpg
             image_paths = []
-            for ts in timestamps:
-                time_label = self.format_time(ts)
-                output_path = os.path.join(self.frame_dir, f"frame_{time_label}.jpg")
-                cmd = ["ffmpeg", "-ss", str(ts), "-i", self.video_path, "-frames:v", "1", "-q:v", "2", "-y", output_path,
-                       "-hide_banner", "-loglevel", "error"]
-                subprocess.run(cmd, check=True)
+            for n in range(count):
+                raw_path = pattern % (n + 1)
+                if not os.path.exists(raw_path):
+                    break
+                output_path = os.path.join(self.frame_dir, f"frame_{self.format_time(n * self.interval)}.jpg")
+                os.replace(raw_path, output_path)
                 image_paths.append(output_path)
             return image_paths
         except Exception as e:
             logger.error(f"分割帧发生错误：{str(e)}")
             raise ValueError("视频处理失败")
 
+    def iter_frames(self, max_frames=1000) -> Iterator[tuple[int, bytes]]:
+        """
+        单次 ffmpeg 调用，将缩放到 unit_width x unit_height 的 RGB 原始帧通过管道逐帧输出，不落盘
+
+        :return: (时间戳秒, rgb24 帧数据) 迭代器
+        """
+        count = self._frame_count(max_frames)
+        if count == 0:
+            return
+        vf = f"fps=1/{self.interval},scale={self.unit_width}:{self.unit_height}:flags=lanczos"
+        cmd = self._ffmpeg_input() + ["-vf", vf, "-frames:v", str(count),
+                                      "-f", "rawvideo", "-pix_fmt", "rgb24", "pipe:1"]
+        frame_size = self.unit_width * self.unit_height * 3
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        n = 0
+        try:
+            while True:
+                buf = proc.stdout.read(frame_size)
+                if len(buf) < frame_size:
+                    break
+                yield n * self.interval, buf
+                n += 1
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+            proc.stdout.close()
+            stderr = proc.stderr.read().decode(errors="ignore")
+            proc.stderr.close()
+            proc.wait()
+        if n == 0 and proc.returncode:
+            logger.error(f"分割帧发生错误：{stderr}")
+            raise ValueError("视频处理失败")
+
     def group_images(self) -> list[list[str]]:
         image_files = [os.path.join(self.frame_dir, f) for f in os.listdir(self.frame_dir) if
                        f.startswith("frame_") and f.endswith(".jpg")]
@@ -77,7 +253,7 @@ class VideoReader:
 
         for path in image_paths:
             img = Image.open(path).convert("RGB").resize((self.unit_width, self.unit_height), Image.Resampling.LANCZOS)
-            timestamp = re.search(r"frame_(\d{2})_(\d{2})\.jpg", os.path.basename(path))
+            timestamp = re.search(r"frame_(\d{2,})_(\d{2})\.jpg", os.path.basename(path))
             time_text = f"{timestamp.group(1)}:{timestamp.group(2)}" if timestamp else ""
             draw = ImageDraw.Draw(img)
             draw.text((10, 10), time_text, fill="yellow", font=font, stroke_width=1, stroke_fill="black")
@@ -103,40 +279,135 @@ class VideoReader:
                 base64_images.append(f"data:image/jpeg;base64,{encoded_string}")
         return base64_images
 
+    @staticmethod
+    def dhash(frame: Image.Image) -> int:
+        """
+        64 位差异哈希（dHash）：灰度缩放到 9x8，比较相邻像素明暗
+        """
+        pixels = frame.convert("L").resize((9, 8), Image.Resampling.BILINEAR).tobytes()
+        value = 0
+        for row in range(8):
+            for col in range(8):
+                value = (value << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+        return value
+
+    def select_scene_frames(self, frames: Iterable[tuple[int, bytes]]) -> list[int]:
+        """
+        按画面变化挑选关键帧，返回保留帧的时间戳：与上一张保留帧的 dHash 汉明距离不小于 scene_threshold 才保留；
+        设置了 max_grids 时，超出上限会丢弃与前一帧差异最小的帧（首帧始终保留）。
+        只记录时间戳与哈希，不持有帧数据，帧由 iter_selected_frames 再解码一遍取出。
+        """
+        cap = self.max_grids * self.grid_size[0] * self.grid_size[1] if self.max_grids else None
+        kept: list[tuple[int, int]] = []  # (时间戳, 哈希)
+        deltas: list[int] = []  # deltas[i] 为 kept[i] 与 kept[i - 1] 的距离，deltas[0] 不参与淘汰
+        evicted: list[int] = []
+        total = 0
+        for ts, buf in frames:
+            total += 1
+            h = self.dhash(Image.frombuffer("RGB", (self.unit_width, self.unit_height), buf, "raw", "RGB", 0, 1))
+            delta = bin(h ^ kept[-1][1]).count("1") if kept else 64
+            if kept and delta < self.scene_threshold:
+                continue
+            kept.append((ts, h))
+            deltas.append(delta)
+            if cap and len(kept) > cap:
+                i = min(range(1, len(kept)), key=deltas.__getitem__)
+                evicted.append(kept[i][0])
+                del kept[i], deltas[i]
+                # 被删帧的后一帧改为与再前一帧比较，其余距离不变
+                if i < len(kept):
+                    deltas[i] = bin(kept[i][1] ^ kept[i - 1][1]).count("1")
+
+        logger.info(f"场景采样：{total} 帧中保留 {len(kept)} 帧")
+        if self.frame_index is not None:
+            self.frame_index.mark_cuts(evicted)
+        return [ts for ts, _ in kept]
+
+    def iter_selected_frames(self, timestamps: list[int]) -> Iterator[tuple[int, bytes]]:
+        """再解码一遍视频，只输出指定时间戳的帧；取完最后一帧即停止"""
+        wanted = set(timestamps)
+        if not wanted:
+            return
+        last = max(wanted)
+        for ts, buf in self.iter_frames():
+            if ts in wanted:
+                yield ts, buf
+                if ts == last:
+                    break
+
+    def _index_frames(self, frames: Iterable[tuple[int, bytes]]) -> Iterator[tuple[int, bytes]]:
+        """透传帧数据，同时把每一帧记录进 frame_index（未开启时原样返回）"""
+        if self.frame_index is None:
+            yield from frames
+            return
+        for ts, buf in frames:
+            self.frame_index.add(ts, Image.frombuffer("RGB", (self.unit_width, self.unit_height), buf, "raw", "RGB", 0, 1))
+            yield ts, buf
+
+    def _load_font(self):
+        return ImageFont.truetype(self.font_path, 48) if os.path.exists(self.font_path) else ImageFont.load_default()
+
+    def compose_grids(self, frames: Iterable[tuple[int, bytes]], pad_last: bool = False) -> Iterator[Image.Image]:
+        """
+        在内存中把帧拼成网格图。所有网格共用同一块画布，调用方需在取下一张之前完成编码。
+
+        :param frames: iter_frames 输出的 (时间戳, rgb24 帧数据)，已由 ffmpeg 缩放到单元格尺寸
+        :param pad_last: 不足一组的最后几帧是否补白输出（默认跳过）
+        """
+        cols, rows = self.grid_size
+        group_size = cols * rows
+        font = self._load_font()
+        canvas = Image.new("RGB", (self.unit_width * cols, self.unit_height * rows), (255, 255, 255))
+        draw = ImageDraw.Draw(canvas)
+
+        filled = 0
+        for ts, buf in frames:
+            tile = Image.frombuffer("RGB", (self.unit_width, self.unit_height), buf, "raw", "RGB", 0, 1)
+            x = (filled % cols) * self.unit_width
+            y = (filled // cols) * self.unit_height
+            canvas.paste(tile, (x, y))
+            draw.text((x + 10, y + 10), self.format_time(ts).replace("_", ":"), fill="yellow", font=font,
+                      stroke_width=1, stroke_fill="black")
+            filled += 1
+            if filled == group_size:
+                yield canvas
+                filled = 0
+
+        if filled and pad_last:
+            # 复用的画布上残留上一组的内容，空余格子涂白后输出
+            for i in range(filled, group_size):
+                x = (i % cols) * self.unit_width
+                y = (i // cols) * self.unit_height
+                draw.rectangle((x, y, x + self.unit_width - 1, y + self.unit_height - 1), fill=(255, 255, 255))
+            yield canvas
+        elif filled:
+            logger.warning(f"警告: 跳过最后一组，图片不足 {group_size} 张")
+
+    def encode_image(self, image: Image.Image) -> str:
+        """
+        直接从内存中的 JPEG 缓冲区生成 base64 data URL
+        """
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=self.save_quality)
+        encoded_string = base64.b64encode(buffer.getbuffer()).decode("utf-8")
+        return f"data:image/jpeg;base64,{encoded_string}"
+
     def run(self)->list[str]:
-        logger.info("开始提取视频帧...")
+        """
+        抽帧 -> 拼图 -> 编码 全程在内存中完成，不再写入/回读中间 JPEG
+        """
+        logger.info("开始提取视频帧并拼接网格图...")
         try:
-            # 确保目录存在
-            print(self.frame_dir,self.grid_dir)
-            os.makedirs(self.frame_dir, exist_ok=True)
-            os.makedirs(self.grid_dir, exist_ok=True)
-            #清空帧文件夹
-            for file in os.listdir(self.frame_dir):
-                if file.startswith("frame_"):
-                    os.remove(os.path.join(self.frame_dir, file))
-            print(self.frame_dir,self.grid_dir)
-            #清空网格文件夹
-            for file in os.listdir(self.grid_dir):
-                if file.startswith("grid_"):
-                    os.remove(os.path.join(self.grid_dir, file))
-            print(self.frame_dir,self.grid_dir)
-            self.extract_frames()
-            print("2#3",self.frame_dir,self.grid_dir)
-            logger.info("开始拼接网格图...")
-            image_paths = []
-            groups = self.group_images()
-            for idx, group in enumerate(groups, start=1):
-                if len(group) < self.grid_size[0] * self.grid_size[1]:
-                    logger.warning(f"警告: 跳过第 {idx} 组，图片不足 {self.grid_size[0] * self.grid_size[1]} 张")
-                    continue
-                out_path = self.concat_images(group, f"grid_{idx}")
-                image_paths.append(out_path)
-
-            logger.info("开始编码图像...")
-            urls = self.encode_images_to_base64(image_paths)
+            frames = self.iter_frames()
+            if self.sampling == "scene":
+                # 场景采样后帧数少且每帧都有信息量，最后不足一组也保留
+                frames = self._index_frames(self.iter_selected_frames(self.select_scene_frames(frames)))
+                grids = self.compose_grids(frames, pad_last=True)
+            else:
+                grids = self.compose_grids(self._index_frames(frames))
+            urls = [self.encode_image(grid) for grid in grids]
+            logger.info(f"网格图生成完成，共 {len(urls)} 张")
             return urls
         except Exception as e:
             logger.error(f"发生错误：{str(e)}")
             raise ValueError("视频处理失败")
-
-
@@ -1,5 +1,6 @@
 from pydantic import AnyUrl, validator, BaseModel, field_validator
 import re
+from typing import Optional
 from urllib.parse import urlparse
 
 SUPPORTED_PLATFORMS = {
@@ -27,6 +28,20 @@ def is_supported_video_url(url: str) -> bool:
     return False
 
 
+# 支持批量展开（合集 / 多 P / 播放列表 / 频道）的平台域名
+BATCH_SUPPORTED_HOSTS = {
+    "bilibili": ("bilibili.com", "b23.tv"),
+    "youtube": ("youtube.com", "youtu.be"),
+}
+
+
+def is_supported_batch_url(url: str, platform: Optional[str] = None) -> bool:
+    """链接是否可批量展开；指定 platform 时要求域名属于该平台，避免用其他平台的下载器展开"""
+    host = urlparse(url).netloc.lower()
+    candidates = [BATCH_SUPPORTED_HOSTS.get(platform, ())] if platform else BATCH_SUPPORTED_HOSTS.values()
+    return any(host == h or host.endswith("." + h) for hosts in candidates for h in hosts)
+
+
 class VideoRequest(BaseModel):
     url: AnyUrl
     platform: str
@@ -21,6 +21,11 @@ from app.exceptions.exception_handlers import register_exception_handlers
 from app.utils.logger import get_logger
 from app import create_app
 from app.transcriber.transcriber_provider import get_transcriber
+from app.utils.artifact_writer import status_writer
+from app.utils.image_proxy import image_proxy
+from app.utils.janitor import janitor
+from app.utils.static_files import CachedStaticFiles
+from app.utils.url_parser import close_http_clients
 # from events import register_handler  # 该模块不存在，暂时注释
 from ffmpeg_helper import ensure_ffmpeg_or_raise
 
@@ -64,7 +69,12 @@ async def lifespan(app: FastAPI):
 
     print("[3/3] 正在加载默认 Provider...", flush=True)
     seed_default_providers()
+    janitor.start()
     yield
+    janitor.stop()
+    status_writer.flush_all()
+    await close_http_clients()
+    await image_proxy.close()
 
 app = create_app(lifespan=lifespan)
 
@@ -134,7 +144,7 @@ app.add_middleware(
     allow_headers=["*"],
 )
 register_exception_handlers(app)
-app.mount(static_path, StaticFiles(directory=static_dir), name="static")
+app.mount(static_path, CachedStaticFiles(directory=static_dir), name="static")
 app.mount("/uploads", StaticFiles(directory=uploads_dir), name="uploads")
 
 